@@ -240,12 +240,22 @@ CREATE TABLE notifications (
     related_id UUID, -- can be order_id, message_id, etc.
     telegram_sent BOOLEAN DEFAULT FALSE,
     telegram_sent_at TIMESTAMPTZ,
+    telegram_claimed_by VARCHAR(100),
+    telegram_claimed_until TIMESTAMPTZ,
+    telegram_retry_at TIMESTAMPTZ,
+    telegram_failed_at TIMESTAMPTZ,
+    telegram_error VARCHAR(100),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 -- Comments for notifications table
 COMMENT ON COLUMN notifications.telegram_sent IS 'Чи було сповіщення відправлено в Telegram';
 COMMENT ON COLUMN notifications.telegram_sent_at IS 'Час відправки сповіщення в Telegram';
+COMMENT ON COLUMN notifications.telegram_claimed_by IS 'Екземпляр Telegram бота, що взяв сповіщення в роботу';
+COMMENT ON COLUMN notifications.telegram_claimed_until IS 'До якого часу діє оренда сповіщення екземпляром бота';
+COMMENT ON COLUMN notifications.telegram_retry_at IS 'Не раніше якого часу повторити відправку після тимчасової помилки';
+COMMENT ON COLUMN notifications.telegram_failed_at IS 'Коли сповіщення визнане недоставним у Telegram (dead letter)';
+COMMENT ON COLUMN notifications.telegram_error IS 'Причина останньої невдалої відправки в Telegram';
 
 -- Payments Table
 CREATE TABLE payments (
@@ -9,22 +9,44 @@ import path from 'path';
 const router = Router({ mergeParams: true });
 router.use(authenticate);
 
-// GET /v1/orders/:orderId/messages - list messages and mark as read
+// GET /v1/orders/:orderId/messages?since=&updatedSince=&before=&limit= - list messages and mark as read
+// `since` returns only messages created after the given timestamp (incremental sync),
+// `updatedSince` returns messages created, edited or deleted after the given timestamp,
+// `before` + `limit` returns the newest `limit` messages older than the given timestamp (paging back).
 router.get('/', async (req: Request, res: Response) => {
   const orderId = req.params.orderId;
   const userId = req.user!.id;
   try {
-    // Fetch messages
-    const result = await query(
-      `SELECT m.id, m.sender_id AS "senderId", m.receiver_id AS "receiverId", m.content, m.read, m.created_at AS "createdAt", m.updated_at AS "updatedAt", m.edited, m.deleted,
+    const { since, updatedSince, before, limit } = req.query as { since?: string; updatedSince?: string; before?: string; limit?: string };
+    const where: string[] = ['m.order_id = $1'];
+    const params: unknown[] = [orderId];
+    if (since) {
+      params.push(since);
+      where.push(`m.created_at > $${params.length}`);
+    }
+    if (updatedSince) {
+      params.push(updatedSince);
+      where.push(`m.updated_at > $${params.length}`);
+    }
+    if (before) {
+      params.push(before);
+      where.push(`m.created_at < $${params.length}`);
+    }
+    const pageSize = limit ? Math.min(Math.max(parseInt(limit, 10) || 1, 1), 500) : null;
+    // Without `since`/`updatedSince`, a limited page is the newest messages, so fetch them in reverse order
+    const newestFirst = pageSize !== null && !since && !updatedSince;
+    let sql = `SELECT m.id, m.sender_id AS "senderId", m.receiver_id AS "receiverId", m.content, m.read, m.created_at AS "createdAt", m.updated_at AS "updatedAt", m.edited, m.deleted,
               (SELECT COALESCE(json_agg(json_build_object('id', id, 'fileUrl', file_url, 'fileName', file_name)), '[]')
                FROM message_attachments ma WHERE ma.message_id = m.id) AS attachments
        FROM messages m
-       WHERE m.order_id = $1
-       ORDER BY m.created_at`,
-      [orderId]
-    );
-    const messages = result.rows;
+       WHERE ${where.join(' AND ')}
+       ORDER BY m.created_at ${newestFirst ? 'DESC' : 'ASC'}`;
+    if (pageSize !== null) {
+      params.push(pageSize);
+      sql += ` LIMIT $${params.length}`;
+    }
+    const result = await query(sql, params);
+    const messages = newestFirst ? result.rows.reverse() : result.rows;
     // Mark unread messages where receiver is current user as read
     await query(
       `UPDATE messages SET read = true WHERE order_id = $1 AND receiver_id = $2 AND read = false`,
@@ -1,6 +1,7 @@
 import { Router, Request, Response } from 'express';
 import { authenticate } from '../middlewares/auth';
 import { query } from '../db';
+import { notificationEvents } from '../services/notificationService';
 
 const router = Router();
 
@@ -8,29 +9,327 @@ const router = Router();
 // PUBLIC ENDPOINTS (для Telegram бота)
 // ==========================================
 
+// Upper bound for the ?wait= long-poll timeout, in seconds
+const MAX_LONG_POLL_WAIT = 30;
+// Page size of pending-telegram: default and upper bound for ?limit=
+const DEFAULT_PENDING_PAGE = 100;
+const MAX_PENDING_PAGE = 1000;
+// Upper bound for the retryAfter of telegram-failed, in seconds
+const MAX_RETRY_DELAY = 86400;
+// Limits for telegram-claim: batch size and lease duration in seconds
+const MAX_CLAIM_BATCH = 500;
+const MAX_CLAIM_LEASE = 600;
+
+// Heartbeat interval of the telegram-stream, keeps proxies from closing an idle connection
+const STREAM_HEARTBEAT_MS = 15000;
+const UUID_PATTERN = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+const PENDING_TELEGRAM_COLUMNS = `
+      n.id,
+      n.user_id AS "userId",
+      n.type,
+      n.content,
+      n.related_id AS "relatedId",
+      n.created_at AS "createdAt",
+      u.telegram_chat_id AS "chatId",
+      u.language_code AS "languageCode"`;
+
+// Due for Telegram: not sent yet, not dead-lettered, and not held back until a later retry
+const PENDING_TELEGRAM_CONDITIONS = `n.telegram_sent = false
+       AND u.telegram_chat_id IS NOT NULL
+       AND n.telegram_failed_at IS NULL
+       AND (n.telegram_retry_at IS NULL OR n.telegram_retry_at <= NOW())`;
+
+interface PendingPage {
+  limit?: number;
+  // id of the last notification of the previous page (keyset pagination)
+  cursor?: string;
+  types?: string[];
+  excludeTypes?: string[];
+}
+
+const pendingFilters = ({ cursor, types, excludeTypes }: PendingPage, params: unknown[]) => {
+  const filters: string[] = [];
+  if (cursor) {
+    params.push(cursor);
+    filters.push(`(n.created_at, n.id) > (SELECT created_at, id FROM notifications WHERE id = $${params.length})`);
+  }
+  if (types && types.length > 0) {
+    params.push(types);
+    filters.push(`n.type = ANY($${params.length})`);
+  }
+  if (excludeTypes && excludeTypes.length > 0) {
+    params.push(excludeTypes);
+    filters.push(`n.type <> ALL($${params.length})`);
+  }
+  return filters.map(filter => `AND ${filter}`).join(' ');
+};
+
+const fetchPendingTelegram = async (page: PendingPage = {}) => {
+  const params: unknown[] = [page.limit ?? DEFAULT_PENDING_PAGE];
+  const filters = pendingFilters(page, params);
+  const result = await query(
+    `SELECT ${PENDING_TELEGRAM_COLUMNS}
+     FROM notifications n
+     INNER JOIN users u ON n.user_id = u.id
+     WHERE ${PENDING_TELEGRAM_CONDITIONS}
+       ${filters}
+     ORDER BY n.created_at ASC, n.id ASC
+     LIMIT $1`,
+    params
+  );
+  return result.rows;
+};
+
+const countPendingTelegram = async () => {
+  const result = await query(
+    `SELECT COUNT(*)::int AS count
+     FROM notifications n
+     INNER JOIN users u ON n.user_id = u.id
+     WHERE ${PENDING_TELEGRAM_CONDITIONS}`
+  );
+  return result.rows[0].count as number;
+};
+
+// Pending notifications created after the notification with id lastId (for stream resume)
+const fetchPendingTelegramAfter = async (lastId: string) => {
+  const result = await query(
+    `SELECT ${PENDING_TELEGRAM_COLUMNS}
+     FROM notifications n
+     INNER JOIN users u ON n.user_id = u.id
+     WHERE ${PENDING_TELEGRAM_CONDITIONS}
+       AND n.created_at > (SELECT created_at FROM notifications WHERE id = $1)
+     ORDER BY n.created_at ASC
+     LIMIT 1000`,
+    [lastId]
+  );
+  return result.rows;
+};
+
+const fetchPendingTelegramById = async (id: string) => {
+  const result = await query(
+    `SELECT ${PENDING_TELEGRAM_COLUMNS}
+     FROM notifications n
+     INNER JOIN users u ON n.user_id = u.id
+     WHERE n.id = $1
+       AND ${PENDING_TELEGRAM_CONDITIONS}`,
+    [id]
+  );
+  return result.rows[0];
+};
+
+// Leases up to `limit` pending notifications to `owner` for `leaseSeconds`.
+// Free, expired and the owner's own leases are claimable, so claiming again renews the owner's leases.
+const claimPendingTelegram = async (owner: string, limit: number, leaseSeconds: number) => {
+  const result = await query(
+    `WITH claimable AS (
+       SELECT n.id
+       FROM notifications n
+       INNER JOIN users u ON n.user_id = u.id
+       WHERE ${PENDING_TELEGRAM_CONDITIONS}
+         AND (n.telegram_claimed_until IS NULL OR n.telegram_claimed_until < NOW() OR n.telegram_claimed_by = $1)
+       ORDER BY n.created_at ASC
+       LIMIT $2
+       FOR UPDATE OF n SKIP LOCKED
+     )
+     UPDATE notifications n
+     SET telegram_claimed_by = $1, telegram_claimed_until = NOW() + make_interval(secs => $3)
+     FROM claimable c, users u
+     WHERE n.id = c.id AND u.id = n.user_id
+     RETURNING ${PENDING_TELEGRAM_COLUMNS}`,
+    [owner, limit, leaseSeconds]
+  );
+  return result.rows;
+};
+
+// Resolves on the next created notification or after timeoutMs, whichever comes first.
+// Resolves to false if the client disconnected while waiting.
+const waitForNotification = (timeoutMs: number, res: Response) =>
+  new Promise<boolean>(resolve => {
+    const finish = (connected: boolean) => {
+      clearTimeout(timer);
+      notificationEvents.off('created', onCreated);
+      res.off('close', onClose);
+      resolve(connected);
+    };
+    const onCreated = () => finish(true);
+    const onClose = () => finish(false);
+    const timer = setTimeout(onCreated, timeoutMs);
+    notificationEvents.on('created', onCreated);
+    res.on('close', onClose);
+  });
+
 // GET /v1/notifications/pending-telegram - get notifications that need to be sent to Telegram
+// Query:
+//   wait (optional, seconds) - hold the request until a notification appears or the timeout expires
+//   limit (optional, up to 1000), cursor (optional, id of the last notification of the previous page)
+//     - page through the backlog; X-Next-Cursor is set when more rows may follow
+//   types (optional, comma-separated) - only these notification types
+//   excludeTypes (optional, comma-separated) - every notification type except these
+//   count=1 (optional) - report the total number of pending notifications in X-Pending-Count
+// With Accept: application/x-ndjson the rows are written one JSON object per line.
 router.get('/pending-telegram', async (req: Request, res: Response) => {
   try {
+    const wait = Math.min(Math.max(parseFloat(String(req.query.wait ?? '0')) || 0, 0), MAX_LONG_POLL_WAIT);
+    const limit = Math.min(Math.max(parseInt(String(req.query.limit ?? DEFAULT_PENDING_PAGE), 10) || DEFAULT_PENDING_PAGE, 1), MAX_PENDING_PAGE);
+    const cursor = typeof req.query.cursor === 'string' && UUID_PATTERN.test(req.query.cursor) ? req.query.cursor : undefined;
+    const types = typeof req.query.types === 'string' ? req.query.types.split(',').filter(Boolean) : undefined;
+    const excludeTypes = typeof req.query.excludeTypes === 'string' ? req.query.excludeTypes.split(',').filter(Boolean) : undefined;
+    const page: PendingPage = { limit, cursor, types, excludeTypes };
+
+    let rows = await fetchPendingTelegram(page);
+    if (rows.length === 0 && wait > 0 && !cursor) {
+      const connected = await waitForNotification(wait * 1000, res);
+      if (!connected) return;
+      rows = await fetchPendingTelegram(page);
+    }
+    // Tells the bot that this server holds empty polls, so it can poll again right away
+    if (wait > 0) res.set('X-Long-Poll-Wait', String(wait));
+    if (rows.length === limit) res.set('X-Next-Cursor', rows[rows.length - 1].id);
+    if (req.query.count === '1') res.set('X-Pending-Count', String(await countPendingTelegram()));
+
+    if (req.accepts(['application/json', 'application/x-ndjson']) === 'application/x-ndjson') {
+      res.type('application/x-ndjson');
+      for (const row of rows) res.write(JSON.stringify(row) + '\n');
+      res.end();
+      return;
+    }
+    res.json(rows);
+  } catch (err) {
+    console.error(err);
+    res.status(500).json({ message: 'Failed to fetch pending notifications' });
+  }
+});
+
+// POST /v1/notifications/telegram-claim - lease pending notifications to one bot replica
+// Body: { owner: string, limit?: number, leaseSeconds?: number, wait?: number }
+// Notifications leased to one replica are not returned to others until the lease expires,
+// so several bots can share the backlog without sending duplicates.
+router.post('/telegram-claim', async (req: Request, res: Response) => {
+  try {
+    const { owner, limit, leaseSeconds, wait } = req.body as {
+      owner?: unknown; limit?: unknown; leaseSeconds?: unknown; wait?: unknown;
+    };
+    if (typeof owner !== 'string' || owner.length === 0 || owner.length > 100) {
+      return res.status(400).json({ message: 'owner must be a non-empty string of up to 100 characters' });
+    }
+    const batch = Math.min(Math.max(Number(limit) || 100, 1), MAX_CLAIM_BATCH);
+    const lease = Math.min(Math.max(Number(leaseSeconds) || 60, 1), MAX_CLAIM_LEASE);
+    const waitSeconds = Math.min(Math.max(Number(wait) || 0, 0), MAX_LONG_POLL_WAIT);
+
+    let rows = await claimPendingTelegram(owner, batch, lease);
+    if (rows.length === 0 && waitSeconds > 0) {
+      const connected = await waitForNotification(waitSeconds * 1000, res);
+      if (!connected) return;
+      rows = await claimPendingTelegram(owner, batch, lease);
+    }
+    if (waitSeconds > 0) res.set('X-Long-Poll-Wait', String(waitSeconds));
+    res.json(rows);
+  } catch (err) {
+    console.error(err);
+    res.status(500).json({ message: 'Failed to claim notifications' });
+  }
+});
+
+// GET /v1/notifications/telegram-stream - Server-Sent Events stream of notifications to send to Telegram
+// Replays pending notifications on connect (only those after Last-Event-ID when resuming), then pushes new ones.
+router.get('/telegram-stream', async (req: Request, res: Response) => {
+  const lastEventId = req.get('Last-Event-ID');
+  const resumeFrom = lastEventId && UUID_PATTERN.test(lastEventId) ? lastEventId : undefined;
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive',
+    'X-Accel-Buffering': 'no',
+  });
+  res.flushHeaders();
+
+  const send = (notification: { id: string }) => {
+    res.write(`id: ${notification.id}\nevent: notification\ndata: ${JSON.stringify(notification)}\n\n`);
+  };
+  const onCreated = async ({ id }: { id: string }) => {
+    try {
+      const notification = await fetchPendingTelegramById(id);
+      if (notification) send(notification);
+    } catch (err) {
+      console.error(err);
+    }
+  };
+  const heartbeat = setInterval(() => res.write(': ping\n\n'), STREAM_HEARTBEAT_MS);
+  // Subscribe before the replay query so nothing created in between is missed; the bot dedupes by id
+  notificationEvents.on('created', onCreated);
+  res.on('close', () => {
+    clearInterval(heartbeat);
+    notificationEvents.off('created', onCreated);
+  });
+
+  try {
+    const backlog = resumeFrom ? await fetchPendingTelegramAfter(resumeFrom) : await fetchPendingTelegram();
+    backlog.forEach(send);
+  } catch (err) {
+    console.error(err);
+    res.end();
+  }
+});
+
+// PATCH /v1/notifications/telegram-sent - mark a batch of notifications as sent to Telegram (for bot use)
+// Body: { ids: string[] }
+router.patch('/telegram-sent', async (req: Request, res: Response) => {
+  try {
+    const { ids } = req.body as { ids?: unknown };
+    if (!Array.isArray(ids) || ids.length === 0 || ids.length > 1000 || !ids.every(id => typeof id === 'string')) {
+      return res.status(400).json({ message: 'ids must be a non-empty array of up to 1000 notification ids' });
+    }
     const result = await query(
-      `SELECT 
-        n.id,
-        n.user_id AS "userId",
-        n.type,
-        n.content,
-        n.related_id AS "relatedId",
-        n.created_at AS "createdAt",
-        u.telegram_chat_id AS "chatId"
-       FROM notifications n
-       INNER JOIN users u ON n.user_id = u.id
-       WHERE n.telegram_sent = false 
-         AND u.telegram_chat_id IS NOT NULL
-       ORDER BY n.created_at ASC
-       LIMIT 100`
+      `UPDATE notifications 
+       SET telegram_sent = true, telegram_sent_at = NOW() 
+       WHERE id = ANY($1::uuid[]) AND telegram_sent = false
+       RETURNING id`,
+      [ids]
     );
-    res.json(result.rows);
+    res.json({ ids: result.rows.map(r => r.id) });
   } catch (err) {
     console.error(err);
-    res.status(500).json({ message: 'Failed to fetch pending notifications' });
+    res.status(500).json({ message: 'Failed to update notifications' });
+  }
+});
+
+// PATCH /v1/notifications/telegram-failed - report notifications the bot could not send (for bot use)
+// Body: { ids: string[], reason: string, retryAfter?: number }
+//   with retryAfter (seconds) the notifications are held back and released from their lease until then;
+//   without it they are dead-lettered and no longer returned to the bot
+router.patch('/telegram-failed', async (req: Request, res: Response) => {
+  try {
+    const { ids, reason, retryAfter } = req.body as { ids?: unknown; reason?: unknown; retryAfter?: unknown };
+    if (!Array.isArray(ids) || ids.length === 0 || ids.length > 1000 || !ids.every(id => typeof id === 'string')) {
+      return res.status(400).json({ message: 'ids must be a non-empty array of up to 1000 notification ids' });
+    }
+    if (typeof reason !== 'string' || reason.length === 0 || reason.length > 100) {
+      return res.status(400).json({ message: 'reason must be a string of up to 100 characters' });
+    }
+    if (retryAfter !== undefined && (typeof retryAfter !== 'number' || !(retryAfter > 0))) {
+      return res.status(400).json({ message: 'retryAfter must be a positive number of seconds' });
+    }
+    const result = retryAfter !== undefined
+      ? await query(
+        `UPDATE notifications
+         SET telegram_error = $2, telegram_retry_at = NOW() + make_interval(secs => $3),
+             telegram_claimed_by = NULL, telegram_claimed_until = NULL
+         WHERE id = ANY($1::uuid[]) AND telegram_sent = false
+         RETURNING id`,
+        [ids, reason, Math.min(retryAfter, MAX_RETRY_DELAY)]
+      )
+      : await query(
+        `UPDATE notifications
+         SET telegram_error = $2, telegram_failed_at = NOW(), telegram_retry_at = NULL
+         WHERE id = ANY($1::uuid[]) AND telegram_sent = false
+         RETURNING id`,
+        [ids, reason]
+      );
+    res.json({ ids: result.rows.map(r => r.id) });
+  } catch (err) {
+    console.error(err);
+    res.status(500).json({ message: 'Failed to update notifications' });
   }
 });
 
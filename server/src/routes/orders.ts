@@ -13,10 +13,11 @@ router.use(authenticate);
 // GET /v1/orders - fetch orders for authenticated user
 // Query param role determines whether client or performer
 // GET /v1/orders - fetch orders with optional filtering
+// GET /v1/orders?status=&limit=&offset= - one page of orders, newest first
 router.get('/', async (req: Request, res: Response) => {
   try {
     const userId = req.user!.id;
-    const { status, search } = req.query as { status?: string; search?: string };
+    const { status, search, limit, offset } = req.query as { status?: string; search?: string; limit?: string; offset?: string };
     const where: string[] = [];
     const params: unknown[] = [userId];
     let idx = 2;
@@ -34,6 +35,16 @@ router.get('/', async (req: Request, res: Response) => {
       params.push(`%${search}%`);
       idx++;
     }
+    // optional pagination (limit/offset); without limit every order is returned
+    let pagination = '';
+    if (limit) {
+      params.push(Math.min(Math.max(parseInt(limit, 10) || 1, 1), 100));
+      pagination += `LIMIT $${idx}`;
+      idx++;
+      params.push(Math.max(parseInt(offset || '0', 10) || 0, 0));
+      pagination += ` OFFSET $${idx}`;
+      idx++;
+    }
     const sql = `SELECT o.id,
                     o.service_id,
                     COALESCE(s.title, o.title) as title,
@@ -72,7 +83,8 @@ router.get('/', async (req: Request, res: Response) => {
              LEFT JOIN service_categories sc ON s.category_id = sc.id
              LEFT JOIN service_categories oc ON o.category_id = oc.id
              WHERE ${where.join(' AND ')}
-             ORDER BY o.created_at DESC`;
+             ORDER BY o.created_at DESC, o.id
+             ${pagination}`;
     const result = await query(sql, params);
     const orders = result.rows.map(r => ({
       id: r.id,
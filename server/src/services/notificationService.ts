@@ -1,8 +1,13 @@
 import { query } from '../db';
 import { getWebSocketService } from './webSocketService';
 import axios from 'axios';
+import { EventEmitter } from 'events';
 import { config } from '../config/config';
 
+// Emits 'created' for every new notification so long-polling readers can wake up immediately
+export const notificationEvents = new EventEmitter();
+notificationEvents.setMaxListeners(0);
+
 // TODO: implement real email and push services
 async function sendEmail(userId: string, content: string) {
   // EmailService.send(userId, content);
@@ -53,6 +58,7 @@ export async function createNotification(userId: string, type: string, content:
   
   const notification = result.rows[0];
   console.log(`Notification created successfully:`, notification);
+  notificationEvents.emit('created', { id: notification.id, userId });
   
   // Send via WebSocket
   const webSocketService = getWebSocketService();
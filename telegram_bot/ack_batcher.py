@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+class AckBatcher:
+    """
+    Збирає id доставлених сповіщень і підтверджує їх пачками.
+
+    Пачка відправляється, коли набирається `max_batch` id або минає `max_delay`
+    секунд від першого непідтвердженого id. Id, які не вдалося підтвердити,
+    повертаються в чергу і пробуються знову з наступною пачкою — не раніше ніж
+    через `max_delay`, а поки підтвердження не вдаються, з експоненційною паузою
+    до `max_retry_delay`.
+    """
+
+    def __init__(
+        self,
+        acknowledge: Callable[[List[str]], Awaitable[Iterable[str]]],
+        on_acknowledged: Optional[Callable[[List[str]], None]] = None,
+        max_batch: int = 50,
+        max_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+    ):
+        self.acknowledge = acknowledge
+        self.on_acknowledged = on_acknowledged
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retry_delay = max_retry_delay
+        # Кількість невдалих пачок поспіль; скидається, щойно пачка підтвердилася повністю
+        self._failures = 0
+        self._pending: List[str] = []
+        self._wake = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        self._stopping = False
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Зупиняє фоновий цикл і підтверджує все, що ще очікує"""
+        if self._task:
+            # Не скасовуємо цикл: пачка, що саме підтверджується, має завершитися
+            self._stopping = True
+            self._stopped.set()
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._pending:
+            logger.warning(f"{len(self._pending)} notification acknowledgements could not be flushed on shutdown")
+
+    def add(self, notification_id: str):
+        self._pending.append(notification_id)
+        # Будимо цикл на першому id (старт таймера) і коли пачка заповнена
+        if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+            self._wake.set()
+
+    async def flush(self):
+        """Підтверджує всі накопичені id (пачками по max_batch)"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                try:
+                    acknowledged = set(await self.acknowledge(batch))
+                except asyncio.CancelledError:
+                    # Пачка вже знята з черги — повертаємо її, щоб не загубити підтвердження
+                    self._pending[:0] = batch
+                    raise
+                except Exception as e:
+                    logger.error(f"Error acknowledging {len(batch)} notifications: {e}")
+                    acknowledged = set()
+
+                failed = [notification_id for notification_id in batch if notification_id not in acknowledged]
+                if acknowledged and self.on_acknowledged:
+                    self.on_acknowledged([notification_id for notification_id in batch if notification_id in acknowledged])
+                if failed:
+                    # Повертаємо на початок черги і пробуємо знову пізніше
+                    self._pending[:0] = failed
+                    self._failures += 1
+                    break
+                self._failures = 0
+
+    async def _run(self):
+        while not self._stopping:
+            while not self._pending and not self._stopping:
+                self._wake.clear()
+                await self._wake.wait()
+            self._wake.clear()
+            if len(self._pending) < self.max_batch and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+            if self._failures and self._pending and not self._stopping:
+                await self._back_off()
+
+    async def _back_off(self):
+        """Пауза перед повтором невдалої пачки, щоб не засипати запитами бекенд, який не відповідає"""
+        delay = max(self.max_delay, backoff_delay(self._failures - 1, base=self.max_delay, cap=self.max_retry_delay))
+        try:
+            await asyncio.wait_for(self._stopped.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
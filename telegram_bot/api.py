@@ -1,27 +1,311 @@
 import os
+import re
+import time
+import hashlib
+import asyncio
 import logging
 import aiohttp
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Set, Tuple
+from urllib.parse import urlencode
+
+import codec
+from cache import CachedResponse, MemoryValidatorStore, SQLiteValidatorStore, TTLCache, ValidatorStore
+from http_pool import ConnectionStats, PoolConfig, create_session
+from metrics import registry
+from resilience import CircuitBreaker, LatencyWindow, RetryBudget, backoff_delay, endpoint_name
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Freshness (in seconds) of cached GET responses, matched against the endpoint path.
+# Endpoints that are not listed here are never cached.
+CACHE_TTLS = [
+    (re.compile(r"^/orders(?:\?.*)?$"), float(os.getenv("API_CACHE_TTL_ORDERS", "30"))),
+    (re.compile(r"^/orders/[^/]+$"), float(os.getenv("API_CACHE_TTL_ORDER", "15"))),
+    (re.compile(r"^/orders/[^/]+/messages$"), float(os.getenv("API_CACHE_TTL_MESSAGES", "5"))),
+]
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "2048"))
+# How long an expired entry may still be served while it is refreshed in the background
+CACHE_STALE_TTL = float(os.getenv("API_CACHE_STALE_TTL", "300"))
+
+CacheKey = Tuple[str, Optional[str]]
+InflightKey = Tuple[str, str, Optional[str]]
+
+# Endpoints whose responses are revalidated with If-None-Match / If-Modified-Since
+CONDITIONAL_ENDPOINTS = [
+    re.compile(r"^/orders(?:\?.*)?$"),
+    re.compile(r"^/orders/[^/]+$"),
+    re.compile(r"^/orders/[^/]+/messages$"),
+]
+# "memory" or "sqlite"; the sqlite store keeps validated responses across restarts
+VALIDATOR_STORE = os.getenv("API_VALIDATOR_STORE", "memory")
+VALIDATOR_DB_PATH = os.getenv("API_VALIDATOR_DB", "api_validators.sqlite3")
+
+# Total timeouts (in seconds) for endpoints that need more or less than API_TIMEOUT
+ENDPOINT_TIMEOUTS = [
+    (re.compile(r"^/assistant$"), float(os.getenv("API_TIMEOUT_ASSISTANT", "60"))),
+    (re.compile(r"^/users/by-telegram/[^/]+$"), float(os.getenv("API_TIMEOUT_USER", "5"))),
+]
+
+# Methods whose identical concurrent calls may share a single in-flight request
+# and which are safe to retry
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "2"))
+# Retries may add at most this fraction of extra requests on top of regular traffic
+RETRY_BUDGET_RATIO = float(os.getenv("API_RETRY_BUDGET_RATIO", "0.1"))
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("API_BREAKER_FAILURES", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("API_BREAKER_RESET_TIMEOUT", "30"))
+
+# Hedged GETs: if an attempt is slower than the endpoint's observed HEDGE_PERCENTILE
+# latency, an identical second attempt is raced against it
+HEDGE_ENABLED = os.getenv("API_HEDGE_ENABLED", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("API_HEDGE_PERCENTILE", "95"))
+# Latency samples needed before an endpoint is hedged at all
+HEDGE_MIN_SAMPLES = int(os.getenv("API_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("API_HEDGE_MIN_DELAY", "0.05"))
+# Hedged attempts may add at most this fraction of extra requests on top of hedge-eligible ones;
+# HEDGE_BURST bounds the hedges that can be saved up while latency is normal
+HEDGE_MAX_RATIO = float(os.getenv("API_HEDGE_MAX_RATIO", "0.05"))
+HEDGE_BURST = float(os.getenv("API_HEDGE_BURST", "10"))
+
+# The backend returns at most this many orders per page (GET /orders?limit=)
+ORDERS_MAX_PAGE_SIZE = 100
+
+
+API_REQUESTS = registry.counter(
+    "hiwwer_bot_api_requests_total", "Backend API requests by endpoint, method and HTTP status (or error kind).",
+    ["endpoint", "method", "status"],
+)
+API_LATENCY = registry.histogram(
+    "hiwwer_bot_api_request_duration_seconds", "Latency of backend API requests.", ["endpoint", "method"]
+)
+API_IN_FLIGHT = registry.gauge(
+    "hiwwer_bot_api_requests_in_flight", "Backend API requests currently waiting for a response.", ["endpoint"]
+)
+API_CLIENT_REQUESTS = registry.counter(
+    "hiwwer_bot_api_client_requests_total", "Requests sent to the backend, and GETs served by an identical in-flight request.", ["result"]
+)
+API_CACHE_LOOKUPS = registry.counter(
+    "hiwwer_bot_api_cache_lookups_total", "Response cache lookups by result (hits, stale_hits, misses).", ["result"]
+)
+API_CACHE_EVICTIONS = registry.counter(
+    "hiwwer_bot_api_cache_evictions_total", "Entries evicted from the response cache to stay under its size limit."
+)
+API_CACHE_SIZE = registry.gauge("hiwwer_bot_api_cache_entries", "Entries currently in the response cache.")
+API_CACHE_HIT_RATIO = registry.gauge(
+    "hiwwer_bot_api_cache_hit_ratio", "Fraction of response cache lookups served from the cache, fresh or stale."
+)
+API_HEDGES = registry.counter(
+    "hiwwer_bot_api_hedges_total",
+    "Hedge-eligible GETs, the ones that sent a second attempt, the ones it won, and slow ones the hedge budget did not cover.",
+    ["result"]
+)
+API_HEDGE_RATE = registry.gauge(
+    "hiwwer_bot_api_hedge_rate", "Fraction of hedge-eligible GETs that sent a second attempt."
+)
+API_CONNECTIONS = registry.counter(
+    "hiwwer_bot_api_http_connections_total", "Connections opened, reused or queued by the API client session.", ["kind"]
+)
+
+
+class _BackendUnavailable:
+    """Falsy result returned without calling the backend while a circuit breaker is open."""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "BACKEND_UNAVAILABLE"
+
+
+BACKEND_UNAVAILABLE = _BackendUnavailable()
+
+
+def is_unavailable(result: Any) -> bool:
+    """Return True if an APIClient call was rejected because the backend is unavailable."""
+    return result is BACKEND_UNAVAILABLE
+
+
 class APIClient:
     """A client for interacting with the Hiwwer backend API."""
 
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, hedging: bool = HEDGE_ENABLED, validator_store: Optional[ValidatorStore] = None):
         if not base_url:
             raise ValueError("API base URL is required.")
         self.base_url = base_url
-        self._session = aiohttp.ClientSession()
+        self.pool_config = PoolConfig("API")
+        self.connection_stats = ConnectionStats()
+        # Created lazily so that it is bound to the running event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._cache = TTLCache(max_entries=CACHE_MAX_ENTRIES, stale_ttl=CACHE_STALE_TTL)
+        self._refreshing: Set[CacheKey] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._inflight: Dict[InflightKey, asyncio.Task] = {}
+        self.request_stats = {"sent": 0, "coalesced": 0}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.retry_budget = RetryBudget(ratio=RETRY_BUDGET_RATIO)
+        self.hedging = hedging
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self.hedge_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0}
+        self.hedge_budget = RetryBudget(ratio=HEDGE_MAX_RATIO, max_tokens=HEDGE_BURST)
+        self._validators = validator_store or _default_validator_store()
+        self.conditional_stats = {"not_modified": 0, "modified": 0}
+        API_CLIENT_REQUESTS.set_function(lambda: self.request_stats["sent"], result="sent")
+        API_CLIENT_REQUESTS.set_function(lambda: self.request_stats["coalesced"], result="coalesced")
+        for result in ("hits", "stale_hits", "misses"):
+            API_CACHE_LOOKUPS.set_function(lambda result=result: self._cache.stats()[result], result=result)
+        API_CACHE_EVICTIONS.set_function(lambda: self._cache.stats()["evictions"])
+        API_CACHE_SIZE.set_function(lambda: self._cache.stats()["size"])
+        API_CACHE_HIT_RATIO.set_function(lambda: self._cache.stats()["hit_ratio"])
+        for kind in ("created", "reused", "queued"):
+            API_CONNECTIONS.set_function(lambda kind=kind: getattr(self.connection_stats, kind), kind=kind)
+        API_HEDGE_RATE.set_function(self.hedge_rate)
 
     async def close(self):
-        """Close the underlying aiohttp session."""
-        await self._session.close()
+        """Cancel pending cache refreshes and close the underlying aiohttp session."""
+        for task in list(self._background_tasks):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._validators.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled session, creating it inside the running event loop on first use."""
+        if self._session is None or self._session.closed:
+            self._session = create_session(self.pool_config, self.connection_stats)
+        return self._session
+
+    def _timeout(self, endpoint: str) -> aiohttp.ClientTimeout:
+        """Return the ClientTimeout configured for an endpoint."""
+        for pattern, total in ENDPOINT_TIMEOUTS:
+            if pattern.match(endpoint):
+                return self.pool_config.timeout(total)
+        return self.pool_config.timeout()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Return connection reuse counters and pool limits, for sizing the pool."""
+        stats = self.connection_stats.as_dict()
+        stats["limit"] = self.pool_config.limit
+        stats["limit_per_host"] = self.pool_config.limit_per_host
+        return stats
+
+    @staticmethod
+    def _cache_ttl(endpoint: str) -> Optional[float]:
+        """Return the cache TTL configured for an endpoint, if any."""
+        for pattern, ttl in CACHE_TTLS:
+            if pattern.match(endpoint):
+                return ttl
+        return None
+
+    def breaker_states(self) -> Dict[str, str]:
+        """Return the current state of every endpoint's circuit breaker."""
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters of the response cache."""
+        return self._cache.stats()
+
+    def invalidate(self, endpoint: str, token: Optional[str] = None) -> None:
+        """
+        Drop cached responses for an endpoint.
+
+        Args:
+            endpoint: API endpoint path whose cached responses should be dropped,
+                including the responses for any query string of that path.
+            token: If given, only this user's entries are dropped; otherwise the
+                entries of every user are dropped.
+        """
+        def matches(key: CacheKey) -> bool:
+            path, key_token = key
+            if token is not None and key_token != token:
+                return False
+            return path == endpoint or path.startswith(f"{endpoint}?")
+
+        self._cache.invalidate_where(matches)
 
     async def _request(self, method: str, endpoint: str, token: Optional[str] = None, json: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
-        Performs an asynchronous API request.
+        Performs an API request, serving cacheable GETs from the response cache.
+
+        A fresh cache entry is returned as is. An expired entry that is still within
+        the stale window is returned immediately while a background task refreshes it.
+        """
+        ttl = self._cache_ttl(endpoint) if method == "GET" else None
+        if ttl is None:
+            return await self._send(method, endpoint, token=token, json=json)
+
+        key = (endpoint, token)
+        cached, fresh = self._cache.get(key)
+        if cached is not None:
+            if not fresh:
+                self._schedule_refresh(key, ttl)
+            return cached
+
+        result = await self._send(method, endpoint, token=token)
+        if result is not None and not is_unavailable(result):
+            self._cache.set(key, result, ttl)
+        return result
+
+    def _schedule_refresh(self, key: CacheKey, ttl: float) -> None:
+        """Refresh a stale cache entry in the background, at most once at a time per key."""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, ttl))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh(self, key: CacheKey, ttl: float) -> None:
+        endpoint, token = key
+        try:
+            result = await self._send("GET", endpoint, token=token)
+            if result is not None and not is_unavailable(result):
+                self._cache.set(key, result, ttl)
+        finally:
+            self._refreshing.discard(key)
+
+    async def _send(self, method: str, endpoint: str, token: Optional[str] = None, json: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Sends a request, coalescing identical concurrent idempotent calls.
+
+        Requests with the same method, URL and token share one in-flight call and
+        every awaiter receives the same decoded result. A cancelled awaiter does not
+        cancel the shared call for the others.
+        """
+        if method not in IDEMPOTENT_METHODS:
+            self.request_stats["sent"] += 1
+            return await self._perform(method, endpoint, token=token, json=json)
+
+        key = (method, f"{self.base_url}{endpoint}", token)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.request_stats["coalesced"] += 1
+        else:
+            self.request_stats["sent"] += 1
+            task = asyncio.create_task(self._perform(method, endpoint, token=token))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        """Return the circuit breaker guarding an endpoint, keyed by its id-less name."""
+        name = endpoint_name(endpoint)
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT)
+            self._breakers[name] = breaker
+        return breaker
+
+    async def _perform(self, method: str, endpoint: str, token: Optional[str] = None, json: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Performs an asynchronous API request guarded by the endpoint's circuit breaker.
+
+        Idempotent requests that fail with a connection error, a timeout or a retryable
+        status are retried with jittered exponential backoff, as long as the global retry
+        budget allows it.
 
         Args:
             method: HTTP method (e.g., 'GET', 'POST').
@@ -30,25 +314,185 @@ class APIClient:
             json: Optional JSON payload for the request.
 
         Returns:
-            The JSON response from the API as a dictionary, or None if an error occurs.
+            The JSON response from the API as a dictionary, None if an error occurs,
+            or BACKEND_UNAVAILABLE if the circuit breaker for the endpoint is open.
+        """
+        breaker = self._breaker(endpoint)
+        if not breaker.allow_request():
+            logger.warning(f"Circuit breaker '{breaker.name}' is open, skipping {method} {endpoint}")
+            return BACKEND_UNAVAILABLE
+
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                if self.hedging and method in IDEMPOTENT_METHODS:
+                    result = await self._attempt_hedged(method, endpoint, token=token)
+                else:
+                    result = await self._attempt(method, endpoint, token=token, json=json)
+                breaker.record_success()
+                return result
+            except (aiohttp.ContentTypeError, ValueError) as e:
+                # A 2xx response that is not JSON (e.g. a proxy or maintenance page) means the backend is not serving
+                logger.error(f"API request returned an unreadable body: {method} {endpoint}: {e}")
+            except aiohttp.ClientResponseError as e:
+                logger.error(f"API request failed with status {e.status}: {e.message}")
+                if e.status not in RETRYABLE_STATUSES:
+                    # The backend answered, so it is healthy from the breaker's point of view
+                    breaker.record_success()
+                    return None
+            except aiohttp.ClientError as e:
+                logger.error(f"API request failed: {e}")
+            except asyncio.TimeoutError:
+                logger.error(f"API request timed out: {method} {endpoint}")
+
+            breaker.record_failure()
+            if breaker.is_open:
+                return BACKEND_UNAVAILABLE
+            if (method not in IDEMPOTENT_METHODS or attempt >= MAX_RETRIES
+                    or not self.retry_budget.withdraw() or not breaker.allow_request()):
+                return None
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def hedge_rate(self) -> float:
+        """Return the fraction of hedge-eligible requests that sent a second attempt."""
+        requests = self.hedge_stats["requests"]
+        return self.hedge_stats["hedged"] / requests if requests else 0.0
+
+    async def _timed_attempt(self, window: LatencyWindow, method: str, endpoint: str, token: Optional[str]) -> Any:
+        started = time.monotonic()
+        result = await self._attempt(method, endpoint, token=token)
+        window.record(time.monotonic() - started)
+        return result
+
+    async def _attempt_hedged(self, method: str, endpoint: str, token: Optional[str] = None) -> Any:
+        """
+        Send an idempotent request and, if it is slower than the endpoint's adaptive
+        threshold, race an identical second request against it.
+
+        The first successful response wins and the other attempt is cancelled. If both
+        attempts fail, the primary attempt's error is raised. Hedges draw on a budget that
+        every eligible request tops up by HEDGE_MAX_RATIO, up to HEDGE_BURST.
         """
+        window = self._latencies.setdefault(endpoint_name(endpoint), LatencyWindow())
+        self.hedge_stats["requests"] += 1
+        self.hedge_budget.deposit()
+        API_HEDGES.inc(result="eligible")
+        primary = asyncio.create_task(self._timed_attempt(window, method, endpoint, token))
+        if len(window) < HEDGE_MIN_SAMPLES:
+            return await primary
+
+        threshold = max(window.percentile(HEDGE_PERCENTILE), HEDGE_MIN_DELAY)
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return await primary
+        # The budget refills with recent requests only, so a latency spike cannot hedge every GET
+        if not self.hedge_budget.withdraw():
+            API_HEDGES.inc(result="budget_exhausted")
+            return await primary
+
+        self.hedge_stats["hedged"] += 1
+        API_HEDGES.inc(result="hedged")
+        hedge = asyncio.create_task(self._timed_attempt(window, method, endpoint, token))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_stats["hedge_wins"] += 1
+                            API_HEDGES.inc(result="hedge_won")
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt(self, method: str, endpoint: str, token: Optional[str] = None, json: Optional[Dict[str, Any]] = None) -> Any:
+        """Send a single HTTP request and decode its JSON body, raising on failure."""
+        name = endpoint_name(endpoint)
+        status = "error"
+        started = time.monotonic()
+        API_IN_FLIGHT.inc(endpoint=name)
+        try:
+            result, status = await self._attempt_unmetered(method, endpoint, token=token, json=json)
+            return result
+        except (aiohttp.ContentTypeError, ValueError):
+            status = "invalid_body"
+            raise
+        except aiohttp.ClientResponseError as e:
+            status = str(e.status)
+            raise
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            API_IN_FLIGHT.dec(endpoint=name)
+            API_LATENCY.observe(time.monotonic() - started, endpoint=name, method=method)
+            API_REQUESTS.inc(endpoint=name, method=method, status=status)
+
+    async def _attempt_unmetered(self, method: str, endpoint: str, token: Optional[str] = None, json: Optional[Dict[str, Any]] = None) -> Tuple[Any, str]:
+        """Send the request; returns the decoded body and the HTTP status as a string."""
         headers = {}
         if token:
             headers["Authorization"] = f"Bearer {token}"
 
+        body = None
+        if json is not None:
+            headers["Content-Type"] = "application/json"
+            body = codec.dumps(json)
+
         url = f"{self.base_url}{endpoint}"
-        logger.info(f"Making API request: {method} {url}")
+        logger.debug(f"Making API request: {method} {url}")
 
-        try:
-            async with self._session.request(method, url, headers=headers, json=json) as response:
-                response.raise_for_status()
-                return await response.json()
-        except aiohttp.ClientResponseError as e:
-            logger.error(f"API request failed with status {e.status}: {e.message}")
-            return None
-        except aiohttp.ClientError as e:
-            logger.error(f"API request failed: {e}")
-            return None
+        validator_key = None
+        cached = None
+        if method == "GET" and any(pattern.match(endpoint) for pattern in CONDITIONAL_ENDPOINTS):
+            validator_key = self._validator_key(url, token)
+            cached = self._validators.get(validator_key)
+            if cached is not None:
+                if cached.etag:
+                    headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    headers["If-Modified-Since"] = cached.last_modified
+
+        async with self._get_session().request(method, url, headers=headers, data=body, timeout=self._timeout(endpoint)) as response:
+            if response.status == 304 and cached is not None:
+                self.conditional_stats["not_modified"] += 1
+                return codec.loads(cached.body), "304"
+            response.raise_for_status()
+            raw = await response.read()
+            if raw.strip() and "json" not in response.content_type:
+                raise aiohttp.ContentTypeError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message=f"Attempt to decode JSON with unexpected mimetype: {response.content_type}",
+                    headers=response.headers,
+                )
+
+            if validator_key is not None:
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                if etag or last_modified:
+                    self.conditional_stats["modified"] += 1
+                    self._validators.set(validator_key, CachedResponse(etag, last_modified, raw))
+            return codec.loads(raw), str(response.status)
+
+    @staticmethod
+    def _validator_key(url: str, token: Optional[str]) -> str:
+        """Key a validated response by URL and a digest of the token, so tokens are never persisted."""
+        identity = hashlib.sha256(token.encode()).hexdigest() if token else "-"
+        return f"{identity} {url}"
 
     async def get_user_by_telegram(self, telegram_id: str) -> Optional[Dict[str, Any]]:
         """Fetch a user's data by their Telegram ID."""
@@ -58,25 +502,79 @@ class APIClient:
         """Fetch all orders for the authenticated user."""
         return await self._request("GET", "/orders", token=token)
 
+    async def get_orders_page(self, token: str, limit: int, offset: int = 0, status: Optional[str] = None) -> Optional[list]:
+        """Fetch one page of the user's orders, newest first, optionally filtered by status."""
+        params = {"limit": limit, "offset": offset}
+        if status:
+            params["status"] = status
+        return await self._request("GET", f"/orders?{urlencode(params)}", token=token)
+
+    async def iter_orders(self, token: str, page_size: int = 20, status: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over all of the user's orders, fetching them page by page.
+
+        `page_size` is capped at the backend's ORDERS_MAX_PAGE_SIZE, so that a
+        short page always means the last one. Stops early if a page cannot be fetched.
+        """
+        page_size = max(1, min(page_size, ORDERS_MAX_PAGE_SIZE))
+        offset = 0
+        while True:
+            page = await self.get_orders_page(token, limit=page_size, offset=offset, status=status)
+            if not page:
+                return
+            for order in page:
+                yield order
+            if len(page) < page_size:
+                return
+            offset += page_size
+
     async def get_order_details(self, order_id: str, token: str) -> Optional[Dict[str, Any]]:
         """Fetch the details of a specific order."""
         return await self._request("GET", f"/orders/{order_id}", token=token)
 
-    async def get_messages(self, order_id: str, token: str) -> Optional[list]:
-        """Fetch messages for a specific order."""
-        return await self._request("GET", f"/orders/{order_id}/messages", token=token)
+    async def get_messages(self, order_id: str, token: str, since: Optional[str] = None,
+                           before: Optional[str] = None, limit: Optional[int] = None,
+                           updated_since: Optional[str] = None) -> Optional[list]:
+        """
+        Fetch messages for a specific order, oldest first.
+
+        Args:
+            order_id: The order whose chat to fetch.
+            token: JWT token of the user.
+            since: Only return messages created after this `createdAt` timestamp.
+            before: Only return messages created before this `createdAt` timestamp.
+            limit: Return at most this many messages; without `since` these are the newest ones.
+            updated_since: Only return messages created, edited or deleted after this `updatedAt` timestamp.
+        """
+        params = {
+            key: value
+            for key, value in (("since", since), ("updatedSince", updated_since), ("before", before), ("limit", limit))
+            if value is not None
+        }
+        endpoint = f"/orders/{order_id}/messages"
+        if params:
+            endpoint += f"?{urlencode(params)}"
+        return await self._request("GET", endpoint, token=token)
 
     async def post_message(self, order_id: str, content: str, token: str) -> Optional[Dict[str, Any]]:
         """Post a new message to an order's chat."""
-        return await self._request("POST", f"/orders/{order_id}/messages", token=token, json={"content": content})
+        result = await self._request("POST", f"/orders/{order_id}/messages", token=token, json={"content": content})
+        # Both participants of the order see the new message
+        self.invalidate(f"/orders/{order_id}/messages")
+        return result
 
     async def update_order_status(self, order_id: str, status: str, token: str) -> Optional[Dict[str, Any]]:
         """Update the status of an order."""
-        return await self._request("PATCH", f"/orders/{order_id}", token=token, json={"status": status})
+        result = await self._request("PATCH", f"/orders/{order_id}", token=token, json={"status": status})
+        self.invalidate(f"/orders/{order_id}")
+        self.invalidate("/orders")
+        return result
 
     async def update_language(self, language_code: str, token: str) -> Optional[Dict[str, Any]]:
         """Update the user's language preference."""
-        return await self._request("PATCH", "/users/profile/language", token=token, json={"languageCode": language_code})
+        result = await self._request("PATCH", "/users/profile/language", token=token, json={"languageCode": language_code})
+        self._cache.invalidate_where(lambda key: key[1] == token)
+        return result
 
     async def get_assistant_reply(self, message: str, session_id: str) -> Optional[Dict[str, Any]]:
         """Get a reply from the AI assistant."""
@@ -92,6 +590,11 @@ class APIClient:
         }
         return await self._request("POST", "/auth/link-telegram-account", json=payload)
 
+def _default_validator_store() -> ValidatorStore:
+    if VALIDATOR_STORE == "sqlite":
+        return SQLiteValidatorStore(VALIDATOR_DB_PATH)
+    return MemoryValidatorStore(max_entries=CACHE_MAX_ENTRIES)
+
 # Singleton instance of the API client
 BACKEND_API_URL = os.getenv("BACKEND_API_URL", "http://localhost:8080/v1")
 api_client = APIClient(BACKEND_API_URL)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import time
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BacklogProgress:
+    """
+    Прогрес розбору накопиченої черги сповіщень.
+
+    `total` — скільки сповіщень очікувало на бекенді на початку (None, якщо
+    бекенд цього не повідомив). `report()` пише в лог не частіше ніж раз на
+    `interval` секунд: скільки оброблено, швидкість і орієнтовний час до кінця.
+    """
+
+    def __init__(self, total: Optional[int] = None, interval: float = 10.0):
+        self.total = total
+        self.interval = interval
+        self.queued = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        self._reported = self.started
+
+    @property
+    def processed(self) -> int:
+        return self.queued + self.skipped
+
+    @property
+    def remaining(self) -> int:
+        if self.total is None:
+            return 0
+        return max(0, self.total - self.processed)
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def advance(self, queued: bool):
+        if queued:
+            self.queued += 1
+        else:
+            self.skipped += 1
+
+    def report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._reported < self.interval:
+            return
+        self._reported = now
+        rate = self.rate()
+        if self.total is None:
+            logger.info(f"Backlog catch-up: {self.processed} notifications processed ({rate:.0f}/s)")
+            return
+        eta = f", ~{self.remaining / rate:.0f}s left" if rate > 0 else ""
+        logger.info(f"Backlog catch-up: {self.processed}/{self.total} notifications processed "
+                    f"({self.queued} queued, {self.skipped} already handled, {rate:.0f}/s{eta})")
+
+    def finish(self):
+        elapsed = time.monotonic() - self.started
+        logger.info(f"Backlog catch-up finished: {self.queued} notifications queued, "
+                    f"{self.skipped} already handled in {elapsed:.1f}s")
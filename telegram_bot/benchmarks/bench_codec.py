@@ -0,0 +1,97 @@
+"""
+Micro-benchmark of the JSON codecs available to codec.py on realistic
+order and message payloads.
+
+Usage (from the telegram_bot directory):
+    python benchmarks/bench_codec.py [--orders 200] [--messages 2000] [--repeat 20]
+"""
+import os
+import sys
+import uuid
+import timeit
+import argparse
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec
+
+
+def _timestamp(offset_minutes: int) -> str:
+    moment = datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=offset_minutes)
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+def make_orders(count: int) -> list:
+    """Build an order list shaped like the GET /orders response."""
+    orders = []
+    for i in range(count):
+        orders.append({
+            "id": str(uuid.uuid4()),
+            "service_id": str(uuid.uuid4()),
+            "title": f"Логотип та фірмовий стиль для компанії #{i}",
+            "description": "Потрібно розробити логотип, палітру кольорів і шаблони для соцмереж. " * 3,
+            "status": ["pending", "in_progress", "revision", "completed"][i % 4],
+            "price": 1500 + i,
+            "currency": "UAH",
+            "deadline": _timestamp(i * 60),
+            "createdAt": _timestamp(i),
+            "client": {"id": str(uuid.uuid4()), "name": "Олена Петренко", "avatar": None, "rating": 4.8},
+            "performer": {"id": str(uuid.uuid4()), "name": "Andrii Design Studio", "avatar": "/uploads/a.png", "rating": 4.9},
+            "category": {"id": str(uuid.uuid4()), "name": "Дизайн", "slug": "design"},
+            "unreadMessages": 0,
+            "history": [],
+            "additionalOptions": {"express": i % 2 == 0, "sourceFiles": True},
+            "rating": None,
+            "dispute": None,
+            "files": [{"id": str(uuid.uuid4()), "fileUrl": "/uploads/brief.pdf", "fileName": "brief.pdf"}],
+        })
+    return orders
+
+
+def make_messages(count: int) -> list:
+    """Build a message history shaped like the GET /orders/:id/messages response."""
+    sender, receiver = str(uuid.uuid4()), str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "senderId": sender if i % 2 else receiver,
+            "receiverId": receiver if i % 2 else sender,
+            "content": f"Повідомлення {i}: надсилаю оновлений варіант макета, перевірте будь ласка 🙏",
+            "read": i % 3 == 0,
+            "createdAt": _timestamp(i),
+            "updatedAt": _timestamp(i),
+            "edited": False,
+            "deleted": False,
+            "attachments": [],
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {"orders": make_orders(args.orders), "messages": make_messages(args.messages)}
+    print(f"Selected codec: {codec.CODEC_NAME}")
+    print(f"{'codec':<10}{'payload':<10}{'size KiB':>10}{'decode ms':>12}{'encode ms':>12}")
+
+    for name, factory in codec.CODECS.items():
+        try:
+            decode, encode = factory()
+        except ImportError:
+            print(f"{name:<10}not installed")
+            continue
+        for payload_name, payload in payloads.items():
+            raw = codec.dumps(payload)
+            decode_s = min(timeit.repeat(lambda: decode(raw), number=1, repeat=args.repeat))
+            encode_s = min(timeit.repeat(lambda: encode(payload), number=1, repeat=args.repeat))
+            print(f"{name:<10}{payload_name:<10}{len(raw) / 1024:>10.1f}{decode_s * 1000:>12.3f}{encode_s * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
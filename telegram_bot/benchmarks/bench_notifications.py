@@ -0,0 +1,148 @@
+"""
+Benchmark of notification delivery throughput against a local stand-in backend.
+
+Compares the pooled, shared session of NotificationService ("shared") with the
+previous behaviour of opening a new aiohttp session for every chat_id lookup and
+acknowledgement ("per-call"). Telegram is replaced by a fake bot with a fixed delay.
+
+Usage (from the telegram_bot directory):
+    python benchmarks/bench_notifications.py [--count 2000] [--workers 8] [--latency 0.002]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The benchmark measures backend round-trips, so Telegram's send limits are lifted
+os.environ.setdefault("TELEGRAM_SEND_RATE", "1000000")
+os.environ.setdefault("TELEGRAM_CHAT_SEND_RATE", "1000000")
+# Every run starts with an empty delivery log
+os.environ.setdefault("NOTIFICATION_OUTBOX_PATH", ":memory:")
+# Digests would hold notifications back for their window, after the worker queues are already empty
+os.environ.setdefault("NOTIFICATION_DIGEST_WINDOW", "0")
+
+import codec
+from notification_service import NotificationService
+
+HOST, PORT = "127.0.0.1", 8799
+
+
+class StandInBackend:
+    """Serves the endpoints NotificationService uses, with an artificial latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.acked = 0
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{HOST}:{PORT}/v1"
+
+    async def _pending(self, request: web.Request) -> web.Response:
+        return web.json_response([])
+
+    async def _chat(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        return web.json_response({"chatId": f"chat-{request.match_info['user_id']}"})
+
+    async def _ack(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        self.acked += 1
+        return web.json_response({"id": request.match_info["notification_id"]})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/v1/notifications/pending-telegram", self._pending)
+        app.router.add_get("/v1/users/{user_id}/telegram-chat", self._chat)
+        app.router.add_patch("/v1/notifications/{notification_id}/telegram-sent", self._ack)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, HOST, PORT).start()
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+class FakeBot:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def send_message(self, **kwargs) -> None:
+        await asyncio.sleep(self.delay)
+
+
+class PerCallSessionService(NotificationService):
+    """NotificationService with the old helpers that open a new session per call."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sessions_opened = 0
+
+    async def _get_user_chat_id(self, user_id: str):
+        self.sessions_opened += 1
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{self.backend_url}/users/{user_id}/telegram-chat",
+                                   timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    return codec.loads(await response.read()).get("chatId")
+        return None
+
+    async def _mark_notification_sent(self, notification_id: str):
+        self.sessions_opened += 1
+        async with aiohttp.ClientSession() as session:
+            async with session.patch(f"{self.backend_url}/notifications/{notification_id}/telegram-sent",
+                                     timeout=aiohttp.ClientTimeout(total=10)) as response:
+                await response.read()
+                return response.status == 200
+
+
+async def run(mode: str, args: argparse.Namespace) -> None:
+    backend = StandInBackend(args.latency)
+    await backend.start()
+    service_class = PerCallSessionService if mode == "per-call" else NotificationService
+    service = service_class(FakeBot(args.send_delay), backend.url, workers=args.workers)
+    await service.start()
+
+    started = time.monotonic()
+    for i in range(args.count):
+        await service._enqueue({"id": f"n{i}", "userId": f"u{i % args.users}", "type": "message",
+                                "content": f"Notification {i}", "relatedId": "order-1"})
+    await asyncio.gather(*(queue.join() for queue in service._queues))
+    # Acknowledgements are batched in the background; delivery is done once the backend has them all
+    while backend.acked < args.count:
+        await asyncio.sleep(0.001)
+    elapsed = time.monotonic() - started
+
+    connections = service.connection_stats.as_dict()
+    # Every per-call session opens its own connection
+    connections["created"] += getattr(service, "sessions_opened", 0)
+    await service.stop()
+    await backend.stop()
+    print(f"{mode:<10}{args.count / elapsed:>14.0f}{elapsed:>10.2f}{backend.acked:>8}"
+          f"{connections['created']:>10}{connections['reused']:>10}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2000, help="notifications to deliver")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--users", type=int, default=200, help="distinct recipients")
+    parser.add_argument("--latency", type=float, default=0.002, help="stand-in backend latency (s)")
+    parser.add_argument("--send-delay", type=float, default=0.005, help="fake Telegram send latency (s)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(f"{'mode':<10}{'notif/sec':>14}{'seconds':>10}{'acked':>8}{'new conns':>10}{'reused':>10}")
+    for mode in ("per-call", "shared"):
+        await run(mode, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,187 @@
+import time
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    A bounded in-memory cache with per-entry TTLs and LRU eviction.
+
+    Entries stay readable for `stale_ttl` seconds after they expire so that
+    callers can serve a stale value while refreshing it in the background.
+    """
+
+    def __init__(self, max_entries: int = 1024, stale_ttl: float = 0.0):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive.")
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """
+        Look up a key.
+
+        Returns:
+            A `(value, fresh)` tuple. `value` is None on a miss; `fresh` is
+            False when the value has expired but is still within `stale_ttl`.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+
+        value, expires_at = entry
+        now = time.monotonic()
+        if now >= expires_at + self.stale_ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None, False
+
+        self._entries.move_to_end(key)
+        if now >= expires_at:
+            self.stale_hits += 1
+            return value, False
+
+        self.hits += 1
+        return value, True
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Store a value that is considered fresh for `ttl` seconds."""
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single key if present."""
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every key matching `predicate` and return how many were removed."""
+        stale_keys = [key for key in self._entries if predicate(key)]
+        for key in stale_keys:
+            del self._entries[key]
+        return len(stale_keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for logging and metrics."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+class CachedResponse:
+    """A response body together with the validators needed to revalidate it."""
+
+    __slots__ = ("etag", "last_modified", "body")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+
+
+class ValidatorStore:
+    """Interface for stores that keep responses for conditional GETs."""
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryValidatorStore(ValidatorStore):
+    """Keeps validated responses in memory, evicting the least recently used ones."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class SQLiteValidatorStore(ValidatorStore):
+    """Persists validated responses in a SQLite file so they survive restarts."""
+
+    # Trimming to max_entries scans the table, so it only runs every N writes
+    TRIM_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._writes = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key TEXT PRIMARY KEY,
+                   etag TEXT,
+                   last_modified TEXT,
+                   body BLOB NOT NULL,
+                   stored_at REAL NOT NULL
+               )"""
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        row = self._db.execute(
+            "SELECT etag, last_modified, body FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, etag, last_modified, body, stored_at) VALUES (?, ?, ?, ?, ?)",
+            (key, response.etag, response.last_modified, response.body, time.time()),
+        )
+        self._writes += 1
+        if self._writes % self.TRIM_EVERY == 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY stored_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        self._db.commit()
+
+    def delete(self, key: str) -> None:
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,98 @@
+import os
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import api
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent messages kept locally per chat
+CHAT_WINDOW = int(os.getenv("CHAT_STORE_WINDOW", "50"))
+# Number of chats kept in memory before the least recently viewed one is dropped
+CHAT_STORE_MAX_CHATS = int(os.getenv("CHAT_STORE_MAX_CHATS", "500"))
+
+ChatKey = Tuple[str, str]
+
+
+class ChatHistoryStore:
+    """
+    Keeps a bounded ring buffer of the latest messages of each order chat and
+    only fetches messages created, edited or deleted since the last sync.
+
+    Buffers are keyed by order and token, so a user is only ever served messages
+    that the backend returned for their own token.
+    """
+
+    def __init__(self, client: api.APIClient, window: int = CHAT_WINDOW, max_chats: int = CHAT_STORE_MAX_CHATS):
+        self.client = client
+        self.window = window
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[ChatKey, Deque[Dict[str, Any]]]" = OrderedDict()
+        # Newest `updatedAt` seen per chat; the next sync asks only for changes after it
+        self._synced: Dict[ChatKey, str] = {}
+
+    async def recent(self, order_id: str, token: str, count: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the latest `count` messages of an order chat, oldest first.
+
+        The first call loads the newest `window` messages; later calls only
+        fetch messages created or changed (edited, deleted) since the last sync.
+        If the backend is unavailable the local buffer is served as is.
+        """
+        key = (order_id, token)
+        buffer = self._chats.get(key)
+        synced = self._synced.get(key) if buffer else None
+
+        if synced:
+            fetched = await self.client.get_messages(order_id, token, updated_since=synced)
+        else:
+            fetched = await self.client.get_messages(order_id, token, limit=self.window)
+
+        if api.is_unavailable(fetched) and buffer is not None:
+            return list(buffer)[-count:]
+        if fetched is None or api.is_unavailable(fetched):
+            return fetched
+
+        if buffer is None:
+            buffer = deque(maxlen=self.window)
+            self._chats[key] = buffer
+        self._merge(buffer, fetched)
+        updated = [stamp for stamp in map(_updated_at, fetched) if stamp]
+        if updated:
+            self._synced[key] = max(updated + ([synced] if synced else []))
+
+        self._chats.move_to_end(key)
+        while len(self._chats) > self.max_chats:
+            evicted, _ = self._chats.popitem(last=False)
+            self._synced.pop(evicted, None)
+
+        return list(buffer)[-count:]
+
+    async def older(self, order_id: str, token: str, before: str, count: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Page back through history: return up to `count` messages created before `before`, oldest first."""
+        return await self.client.get_messages(order_id, token, before=before, limit=count)
+
+    @staticmethod
+    def _merge(buffer: Deque[Dict[str, Any]], messages: List[Dict[str, Any]]) -> None:
+        """Replace buffered messages that were edited or deleted and append the new ones."""
+        positions = {message.get("id"): index for index, message in enumerate(buffer)}
+        newest = buffer[-1].get("createdAt") if buffer else None
+        added = []
+        for message in messages:
+            index = positions.get(message.get("id"))
+            if index is not None:
+                buffer[index] = message
+            # Changes to messages older than the buffered window are not kept
+            elif newest is None or (message.get("createdAt") or "") >= newest:
+                added.append(message)
+        # Appending may drop the oldest messages, so it happens after the replacements
+        buffer.extend(added)
+
+
+def _updated_at(message: Dict[str, Any]) -> Optional[str]:
+    return message.get("updatedAt") or message.get("createdAt")
+
+
+# Singleton instance of the chat history store
+chat_store = ChatHistoryStore(api.api_client)
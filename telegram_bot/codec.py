@@ -0,0 +1,71 @@
+# JSON encoding and decoding for HTTP payloads.
+# Uses orjson or msgspec when one of them is installed and falls back to the
+# standard library otherwise. Set JSON_CODEC to `orjson`, `msgspec` or `json`
+# to force a specific implementation.
+import os
+import json
+import logging
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _stdlib_codec() -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return json.loads, dumps
+
+
+def _orjson_codec() -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    import orjson
+    return orjson.loads, orjson.dumps
+
+
+def _msgspec_codec() -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    import msgspec
+    return msgspec.json.decode, msgspec.json.encode
+
+
+CODECS: Dict[str, Callable[[], Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]]] = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "json": _stdlib_codec,
+}
+
+
+def _select_codec(preferred: str) -> Tuple[str, Callable[[bytes], Any], Callable[[Any], bytes]]:
+    names = [preferred] if preferred in CODECS else list(CODECS)
+    for name in names + ["json"]:
+        try:
+            decode, encode = CODECS[name]()
+            return name, decode, encode
+        except ImportError:
+            logger.debug(f"JSON codec '{name}' is not installed")
+    raise RuntimeError("No JSON codec available")
+
+
+CODEC_NAME, _decode, dumps = _select_codec(os.getenv("JSON_CODEC", "auto"))
+logger.info(f"Using '{CODEC_NAME}' JSON codec")
+
+
+def loads(body: bytes) -> Any:
+    """Decode a raw JSON body; an empty body decodes to None. Invalid JSON raises ValueError with every codec."""
+    if not body or not body.strip():
+        return None
+    try:
+        return _decode(body)
+    except ValueError:
+        raise
+    except Exception as e:
+        # msgspec.DecodeError is not a ValueError, unlike the errors of json and orjson
+        raise ValueError(str(e)) from e
+
+
+async def iter_ndjson(lines: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """
+    Decode newline-delimited JSON (application/x-ndjson) one object per line
+    as lines arrive, e.g. from `response.content`; blank lines are skipped.
+    """
+    async for line in lines:
+        if line.strip():
+            yield _decode(line)
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DigestCoalescer:
+    """
+    Збирає сповіщення для одного чату протягом `window` секунд і передає їх
+    у `deliver(chat_id, notifications)` однією пачкою.
+
+    Пачка відправляється раніше, якщо в ній набралося `max_items` сповіщень.
+    Пачки одного чату доставляються строго по черзі, тож порядок зберігається.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[str, List[dict]], Awaitable[None]],
+        window: float = 2.0,
+        max_items: int = 10,
+    ):
+        self.deliver = deliver
+        self.window = window
+        self.max_items = max_items
+        self._pending: Dict[str, List[dict]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # Остання запущена доставка кожного чату; наступна чекає на неї
+        self._deliveries: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return sum(len(batch) for batch in self._pending.values())
+
+    def add(self, chat_id: str, notification: dict):
+        batch = self._pending.setdefault(chat_id, [])
+        batch.append(notification)
+        if len(batch) >= self.max_items:
+            self._flush(chat_id)
+        elif len(batch) == 1:
+            self._timers[chat_id] = asyncio.get_running_loop().call_later(self.window, self._flush, chat_id)
+
+    async def stop(self):
+        """Доставляє все, що ще очікує, і чекає завершення доставок"""
+        for chat_id in list(self._pending):
+            self._flush(chat_id)
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries.values(), return_exceptions=True)
+
+    def _flush(self, chat_id: str):
+        timer = self._timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(chat_id, None)
+        if not batch:
+            return
+        previous = self._deliveries.get(chat_id)
+        task = asyncio.create_task(self._deliver_after(previous, chat_id, batch))
+        self._deliveries[chat_id] = task
+        task.add_done_callback(lambda done: self._forget(chat_id, done))
+
+    async def _deliver_after(self, previous: Optional[asyncio.Task], chat_id: str, batch: List[dict]):
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await self.deliver(chat_id, batch)
+        except Exception as e:
+            logger.error(f"Error delivering {len(batch)} notifications to chat_id={chat_id}: {e}")
+
+    def _forget(self, chat_id: str, task: asyncio.Task):
+        if self._deliveries.get(chat_id) is task:
+            del self._deliveries[chat_id]
@@ -7,6 +7,7 @@ from telegram.ext import ContextTypes, ConversationHandler
 ContextType = ContextTypes.DEFAULT_TYPE
 
 import api
+import chat_store
 import keyboards
 import localization
 from localization import get_text
@@ -17,6 +18,11 @@ logger = logging.getLogger(__name__)
 # Conversation states
 MAIN_MENU, ORDER_MENU, CHAT_MENU, ASSISTANT_MENU, LANGUAGE_MENU, COMMANDS_MENU = range(6)
 
+# Number of chat messages shown per screen
+CHAT_PAGE_SIZE = 10
+# Number of orders shown per page of the order list
+ORDERS_PAGE_SIZE = 8
+
 def _get_lang(context: ContextType) -> str:
     """Safely get user's language code, defaulting to 'en'."""
     return context.user_data.get("user", {}).get("languageCode", "en")
@@ -41,6 +47,11 @@ async def link_account(update: Update, context: ContextType) -> None:
         await update.message.reply_text(get_text('link_success', lang_code))
         # Trigger the /start logic again to show the main menu
         await start(update, context)
+        # The user now has a chat_id, so drop any cached "no chat" entry
+        notification_service = context.bot_data.get("notification_service")
+        user_id = context.user_data.get("user", {}).get("id")
+        if notification_service and user_id:
+            notification_service.invalidate_chat_id(user_id)
     else:
         # A more specific error could be sent from the backend if needed
         await update.message.reply_text(get_text('link_fail', lang_code))
@@ -73,7 +84,7 @@ async def start(update: Update, context: ContextType) -> int:
     return MAIN_MENU
 
 async def my_orders(update: Update, context: ContextType) -> int:
-    """Show user's orders."""
+    """Show one page of the user's orders, optionally filtered by status."""
     query = update.callback_query
     await query.answer()
     lang_code = _get_lang(context)
@@ -83,18 +94,41 @@ async def my_orders(update: Update, context: ContextType) -> int:
         await query.edit_message_text(get_text('auth_error', lang_code))
         return MAIN_MENU
 
-    orders = await api.api_client.get_orders(token)
+    # Callback data is 'my_orders' or 'orders_page_<page>_<status|all>'
+    page, status = 0, None
+    if query.data.startswith('orders_page_'):
+        _, _, page_str, status_key = query.data.split('_', 3)
+        page = int(page_str)
+        status = None if status_key == 'all' else status_key
 
-    if not orders:
+    # One extra order tells whether there is a next page
+    orders = await api.api_client.get_orders_page(token, limit=ORDERS_PAGE_SIZE + 1, offset=page * ORDERS_PAGE_SIZE, status=status)
+
+    if api.is_unavailable(orders):
+        await query.edit_message_text(
+            text=get_text('backend_unavailable', lang_code),
+            reply_markup=keyboards.get_back_to_main_menu_keyboard(lang_code)
+        )
+        return MAIN_MENU
+
+    if not orders and page == 0 and status is None:
         await query.edit_message_text(
             text=get_text('no_orders', lang_code),
             reply_markup=keyboards.get_back_to_main_menu_keyboard(lang_code)
         )
         return MAIN_MENU
 
+    orders = orders or []
+    text = get_text('your_orders', lang_code) if orders else get_text('no_orders', lang_code)
+    if page > 0:
+        text += "\n" + get_text('orders_page', lang_code, page=page + 1)
+
     await query.edit_message_text(
-        text=get_text('your_orders', lang_code),
-        reply_markup=keyboards.get_orders_keyboard(orders, lang_code)
+        text=text,
+        reply_markup=keyboards.get_orders_keyboard(
+            orders[:ORDERS_PAGE_SIZE], lang_code,
+            page=page, has_next=len(orders) > ORDERS_PAGE_SIZE, status=status
+        )
     )
 
     return ORDER_MENU
@@ -116,8 +150,9 @@ async def view_order(update: Update, context: ContextType) -> int:
     order = await api.api_client.get_order_details(order_id, token)
 
     if not order:
+        error_key = 'backend_unavailable' if api.is_unavailable(order) else 'order_not_found'
         await query.edit_message_text(
-            text=get_text('order_not_found', lang_code),
+            text=get_text(error_key, lang_code),
             reply_markup=keyboards.get_back_to_orders_keyboard(lang_code)
         )
         return ORDER_MENU
@@ -166,6 +201,13 @@ async def chat_list(update: Update, context: ContextType) -> int:
 
     orders = await api.api_client.get_orders(token)
 
+    if api.is_unavailable(orders):
+        await query.edit_message_text(
+            text=get_text('backend_unavailable', lang_code),
+            reply_markup=keyboards.get_back_to_main_menu_keyboard(lang_code)
+        )
+        return MAIN_MENU
+
     if not orders:
         await query.edit_message_text(
             text=get_text('no_chats', lang_code),
@@ -218,27 +260,24 @@ async def view_chat(update: Update, context: ContextType) -> int:
 
     order_details = await api.api_client.get_order_details(order_id, token)
     if not order_details:
+        error_key = 'backend_unavailable' if api.is_unavailable(order_details) else 'order_not_found'
         await query.edit_message_text(
-            get_text('order_not_found', lang_code),
+            get_text(error_key, lang_code),
             reply_markup=keyboards.get_back_to_main_menu_keyboard(lang_code)
         )
         return CHAT_MENU
 
-    messages_data = await api.api_client.get_messages(order_id, token)
+    messages_data = await chat_store.chat_store.recent(order_id, token, count=CHAT_PAGE_SIZE)
 
     context.user_data["current_chat_order_id"] = order_id
-
-    client_name = order_details["client"]["name"]
-    performer_name = order_details.get("performer", {}).get("name", "N/A")
+    # Paging back through history starts from the oldest message shown
+    context.user_data["chat_history_cursor"] = messages_data[0]["createdAt"] if messages_data else None
 
     chat_display = get_text('chat_title', lang_code, title=order_details['title']) + "\n\n"
     if not messages_data:
         chat_display += get_text('no_messages', lang_code)
     else:
-        for msg in messages_data[-10:]:
-            sender_name = client_name if msg["senderId"] == order_details["client"]["id"] else performer_name
-            timestamp = datetime.fromisoformat(msg['createdAt'].replace('Z', '+00:00')).strftime("%d %b, %H:%M")
-            chat_display += f"*{sender_name}* ({timestamp}):\n_{msg['content']}_\n\n"
+        chat_display += _format_chat_messages(messages_data, order_details)
 
     await query.edit_message_text(
         text=chat_display,
@@ -248,6 +287,59 @@ async def view_chat(update: Update, context: ContextType) -> int:
 
     return CHAT_MENU
 
+async def view_chat_history(update: Update, context: ContextType) -> int:
+    """Show the page of chat messages preceding the ones currently displayed."""
+    query = update.callback_query
+    await query.answer()
+    lang_code = _get_lang(context)
+
+    order_id = query.data.split('_')[1]
+    token = context.user_data.get("token")
+
+    if not token or not context.user_data.get("user"):
+        await query.edit_message_text(get_text('auth_error', lang_code))
+        return MAIN_MENU
+
+    cursor = None
+    if context.user_data.get("current_chat_order_id") == order_id:
+        cursor = context.user_data.get("chat_history_cursor")
+
+    order_details = await api.api_client.get_order_details(order_id, token)
+    messages_data = await chat_store.chat_store.older(order_id, token, before=cursor, count=CHAT_PAGE_SIZE) if cursor and order_details else None
+
+    if not messages_data:
+        error_key = 'backend_unavailable' if api.is_unavailable(order_details) or api.is_unavailable(messages_data) else 'no_older_messages'
+        await query.edit_message_text(
+            get_text(error_key, lang_code),
+            reply_markup=keyboards.get_back_to_chat_keyboard(order_id, lang_code)
+        )
+        return CHAT_MENU
+
+    context.user_data["chat_history_cursor"] = messages_data[0]["createdAt"]
+
+    chat_display = get_text('chat_title', lang_code, title=order_details['title']) + "\n\n"
+    chat_display += _format_chat_messages(messages_data, order_details)
+
+    await query.edit_message_text(
+        text=chat_display,
+        reply_markup=keyboards.get_chat_history_keyboard(order_id, len(messages_data) >= CHAT_PAGE_SIZE, lang_code),
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+    return CHAT_MENU
+
+def _format_chat_messages(messages: list, order_details: dict) -> str:
+    """Render chat messages, oldest first, with sender names and timestamps."""
+    client_name = order_details["client"]["name"]
+    performer_name = (order_details.get("performer") or {}).get("name", "N/A")
+
+    chat_display = ""
+    for msg in messages:
+        sender_name = client_name if msg["senderId"] == order_details["client"]["id"] else performer_name
+        timestamp = datetime.fromisoformat(msg['createdAt'].replace('Z', '+00:00')).strftime("%d %b, %H:%M")
+        chat_display += f"*{sender_name}* ({timestamp}):\n_{msg['content']}_\n\n"
+    return chat_display
+
 async def send_message_prompt(update: Update, context: ContextType) -> int:
     """Prompt user to type their message."""
     query = update.callback_query
@@ -315,11 +407,24 @@ async def handle_order_action(update: Update, context: ContextType) -> int:
 
     api_response = await api.api_client.update_order_status(order_id, new_status, token)
 
-    message = get_text('order_status_updated', lang_code, status=new_status.replace('_', ' ')) if api_response else get_text('order_status_fail', lang_code)
+    if api_response:
+        message = get_text('order_status_updated', lang_code, status=new_status.replace('_', ' '))
+    elif api.is_unavailable(api_response):
+        message = get_text('backend_unavailable', lang_code)
+    else:
+        message = get_text('order_status_fail', lang_code)
 
     order = await api.api_client.get_order_details(order_id, token)
     user_id = context.user_data.get("user", {}).get("id")
 
+    if not order:
+        await query.edit_message_text(
+            text=message,
+            reply_markup=keyboards.get_back_to_orders_keyboard(lang_code),
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return ORDER_MENU
+
     await query.edit_message_text(
         text=message,
         reply_markup=keyboards.get_order_detail_keyboard(order, user_id, lang_code),
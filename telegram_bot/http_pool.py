@@ -0,0 +1,92 @@
+import os
+import logging
+import aiohttp
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class PoolConfig:
+    """
+    Connection pool settings for an aiohttp session, read from environment
+    variables that share a common prefix (e.g. `API_POOL_LIMIT`).
+    """
+
+    def __init__(self, prefix: str, limit: int = 100, limit_per_host: int = 20,
+                 keepalive_timeout: float = 30.0, dns_cache_ttl: int = 300,
+                 total_timeout: float = 10.0, connect_timeout: float = 3.0):
+        self.limit = _env_int(f"{prefix}_POOL_LIMIT", limit)
+        self.limit_per_host = _env_int(f"{prefix}_POOL_LIMIT_PER_HOST", limit_per_host)
+        self.keepalive_timeout = _env_float(f"{prefix}_KEEPALIVE_TIMEOUT", keepalive_timeout)
+        self.dns_cache_ttl = _env_int(f"{prefix}_DNS_CACHE_TTL", dns_cache_ttl)
+        self.total_timeout = _env_float(f"{prefix}_TIMEOUT", total_timeout)
+        self.connect_timeout = _env_float(f"{prefix}_CONNECT_TIMEOUT", connect_timeout)
+
+    def timeout(self, total: Optional[float] = None) -> aiohttp.ClientTimeout:
+        """Build a ClientTimeout using the configured connect timeout."""
+        return aiohttp.ClientTimeout(
+            total=total if total is not None else self.total_timeout,
+            connect=self.connect_timeout,
+        )
+
+
+class ConnectionStats:
+    """Counts new, reused and queued connections through aiohttp tracing hooks."""
+
+    def __init__(self):
+        self.created = 0
+        self.reused = 0
+        self.queued = 0
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_connection_create_end.append(self._on_create)
+        self.trace_config.on_connection_reuseconn.append(self._on_reuse)
+        self.trace_config.on_connection_queued_start.append(self._on_queued)
+
+    async def _on_create(self, session, ctx, params) -> None:
+        self.created += 1
+
+    async def _on_reuse(self, session, ctx, params) -> None:
+        self.reused += 1
+
+    async def _on_queued(self, session, ctx, params) -> None:
+        self.queued += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        acquired = self.created + self.reused
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "queued": self.queued,
+            "reuse_ratio": self.reused / acquired if acquired else 0.0,
+        }
+
+
+def create_session(config: PoolConfig, stats: Optional[ConnectionStats] = None) -> aiohttp.ClientSession:
+    """
+    Create a pooled aiohttp session. Must be called from within a running event loop.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.limit,
+        limit_per_host=config.limit_per_host,
+        keepalive_timeout=config.keepalive_timeout,
+        ttl_dns_cache=config.dns_cache_ttl,
+    )
+    logger.info(
+        f"Creating HTTP session: limit={config.limit}, limit_per_host={config.limit_per_host}, "
+        f"keepalive={config.keepalive_timeout}s"
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=config.timeout(),
+        trace_configs=[stats.trace_config] if stats else None,
+    )
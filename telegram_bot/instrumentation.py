@@ -0,0 +1,82 @@
+import time
+import logging
+import functools
+from typing import Any, Callable, Optional
+
+from telegram.ext import Application, BaseHandler, CallbackQueryHandler, ConversationHandler
+from telegram.request import HTTPXRequest, RequestData
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_REQUESTS = registry.counter(
+    "hiwwer_bot_telegram_requests_total", "Telegram Bot API calls by method and HTTP status.", ["method", "status"]
+)
+TELEGRAM_LATENCY = registry.histogram(
+    "hiwwer_bot_telegram_request_duration_seconds", "Latency of Telegram Bot API calls.", ["method"]
+)
+HANDLER_LATENCY = registry.histogram(
+    "hiwwer_bot_handler_duration_seconds", "Execution time of update handlers by callback pattern or command.", ["handler"]
+)
+HANDLER_ERRORS = registry.counter(
+    "hiwwer_bot_handler_errors_total", "Update handlers that raised an exception.", ["handler"]
+)
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that records the count and latency of every Bot API call."""
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None, **kwargs: Any):
+        # Bot API urls end with the method name, e.g. .../bot<token>/sendMessage
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.monotonic()
+        status = "error"
+        try:
+            code, payload = await super().do_request(url, method, request_data, **kwargs)
+            status = str(code)
+            return code, payload
+        finally:
+            TELEGRAM_LATENCY.observe(time.monotonic() - started, method=api_method)
+            TELEGRAM_REQUESTS.inc(method=api_method, status=status)
+
+
+def _handler_label(handler: BaseHandler) -> str:
+    if isinstance(handler, CallbackQueryHandler) and handler.pattern is not None:
+        return getattr(handler.pattern, "pattern", str(handler.pattern))
+    commands = getattr(handler, "commands", None)
+    if commands:
+        return "/" + ",".join(sorted(commands))
+    return getattr(handler.callback, "__name__", type(handler).__name__)
+
+
+def _timed(callback: Callable, label: str) -> Callable:
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.monotonic()
+        try:
+            return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=label)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.monotonic() - started, handler=label)
+    return wrapper
+
+
+def _instrument_handler(handler: BaseHandler) -> None:
+    if isinstance(handler, ConversationHandler):
+        for child in handler.entry_points + handler.fallbacks:
+            _instrument_handler(child)
+        for state_handlers in handler.states.values():
+            for child in state_handlers:
+                _instrument_handler(child)
+        return
+    handler.callback = _timed(handler.callback, _handler_label(handler))
+
+
+def instrument_handlers(application: Application) -> None:
+    """Record execution time of every registered handler, labelled by callback pattern or command."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            _instrument_handler(handler)
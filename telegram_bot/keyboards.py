@@ -1,5 +1,6 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 import os
+from typing import Optional
 from dotenv import load_dotenv
 import localization
 
@@ -39,9 +40,21 @@ def get_unregistered_user_keyboard(telegram_id: str, lang_code: str) -> InlineKe
     ]
     return InlineKeyboardMarkup(keyboard)
 
-def get_orders_keyboard(orders: list, lang_code: str) -> InlineKeyboardMarkup:
-    """Returns the keyboard for the order list view."""
-    order_buttons = []
+# Status filters offered above the order list; None means all orders
+ORDER_STATUS_FILTERS = [None, "pending", "in_progress", "completed"]
+
+def get_orders_keyboard(orders: list, lang_code: str, page: int = 0, has_next: bool = False, status: Optional[str] = None) -> InlineKeyboardMarkup:
+    """Returns the keyboard for one page of the order list view, with status filters and page navigation."""
+    status_key = status or "all"
+    filter_buttons = []
+    for status_filter in ORDER_STATUS_FILTERS:
+        filter_key = status_filter or "all"
+        label = localization.get_text(f'orders_filter_{filter_key}', lang_code)
+        if filter_key == status_key:
+            label = f"• {label}"
+        filter_buttons.append(InlineKeyboardButton(label, callback_data=f"orders_page_0_{filter_key}"))
+
+    order_buttons = [filter_buttons]
     for order in orders:
         status_emoji = {
             "pending": "⏳", "in_progress": "🔄", "revision": "🔍",
@@ -55,6 +68,14 @@ def get_orders_keyboard(orders: list, lang_code: str) -> InlineKeyboardMarkup:
             )
         ])
 
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(localization.get_text('prev_page_button', lang_code), callback_data=f"orders_page_{page - 1}_{status_key}"))
+    if has_next:
+        navigation.append(InlineKeyboardButton(localization.get_text('next_page_button', lang_code), callback_data=f"orders_page_{page + 1}_{status_key}"))
+    if navigation:
+        order_buttons.append(navigation)
+
     order_buttons.append([InlineKeyboardButton(localization.get_text('back_to_main_menu_button', lang_code), callback_data='back_to_main')])
     return InlineKeyboardMarkup(order_buttons)
 
@@ -80,12 +101,21 @@ def get_chat_view_keyboard(order_id: str, lang_code: str) -> InlineKeyboardMarku
     """Returns the keyboard for the chat view."""
     keyboard = [
         [InlineKeyboardButton(localization.get_text('send_message_button', lang_code), callback_data=f"send_msg_{order_id}")],
+        [InlineKeyboardButton(localization.get_text('older_messages_button', lang_code), callback_data=f"history_{order_id}")],
         [InlineKeyboardButton(localization.get_text('refresh_chat_button', lang_code), callback_data=f"chat_{order_id}")],
         [InlineKeyboardButton(localization.get_text('view_order_button', lang_code), callback_data=f"order_{order_id}")],
         [InlineKeyboardButton(localization.get_text('back_to_chats_button', lang_code), callback_data='messages')]
     ]
     return InlineKeyboardMarkup(keyboard)
 
+def get_chat_history_keyboard(order_id: str, has_older: bool, lang_code: str) -> InlineKeyboardMarkup:
+    """Returns the keyboard for paging back through chat history."""
+    keyboard = []
+    if has_older:
+        keyboard.append([InlineKeyboardButton(localization.get_text('older_messages_button', lang_code), callback_data=f"history_{order_id}")])
+    keyboard.append([InlineKeyboardButton(localization.get_text('back_to_chat_button', lang_code), callback_data=f"chat_{order_id}")])
+    return InlineKeyboardMarkup(keyboard)
+
 def get_assistant_keyboard(lang_code: str) -> InlineKeyboardMarkup:
     """Returns the keyboard for the AI assistant view."""
     return InlineKeyboardMarkup([[InlineKeyboardButton(localization.get_text('back_to_main_menu_button', lang_code), callback_data='back_to_main')]])
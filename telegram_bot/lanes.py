@@ -0,0 +1,108 @@
+import os
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Lane(NamedTuple):
+    """
+    Смуга доставки для групи типів сповіщень.
+
+    `target` — бажана затримка доставки в секундах: сповіщення обслуговуються
+    в порядку `час надходження + target`, тож термінові йдуть першими, а
+    сповіщення з повільних смуг, що чекають довше за різницю цілей, все одно
+    обганяють нові термінові (захист від голодування).
+    `digest` — чи можна об'єднувати сповіщення смуги в дайджести.
+    """
+
+    name: str
+    types: Tuple[str, ...]
+    target: float
+    digest: bool
+
+
+DEFAULT_LANES = (
+    Lane("critical", ("payment", "dispute", "deadline"), 1.0, False),
+    Lane("normal", ("new_order", "status_change", "review"), 5.0, True),
+    Lane("chat", ("message",), 30.0, True),
+)
+# Смуга для типів, не перелічених у жодній смузі
+DEFAULT_LANE = "normal"
+
+
+def parse_lanes(spec: str) -> Tuple[Lane, ...]:
+    """
+    Розбирає опис смуг з NOTIFICATION_LANES:
+    `critical=payment,dispute,deadline:1:nodigest;normal=new_order,status_change,review:5;chat=message:30`
+    """
+    lanes = []
+    for part in filter(None, (chunk.strip() for chunk in spec.split(";"))):
+        name, _, rest = part.partition("=")
+        fields = rest.split(":")
+        if not name or len(fields) < 2:
+            raise ValueError(f"Invalid lane definition: {part!r}")
+        types = tuple(filter(None, (t.strip() for t in fields[0].split(","))))
+        lanes.append(Lane(name.strip(), types, float(fields[1]), "nodigest" not in fields[2:]))
+    return tuple(lanes)
+
+
+def _lanes_from_env() -> Tuple[Lane, ...]:
+    spec = os.getenv("NOTIFICATION_LANES")
+    if not spec:
+        return DEFAULT_LANES
+    try:
+        return parse_lanes(spec)
+    except ValueError as e:
+        logger.error(f"{e}; using default notification lanes")
+        return DEFAULT_LANES
+
+
+class LaneRouter:
+    """Визначає смугу за типом сповіщення"""
+
+    def __init__(self, lanes: Sequence[Lane], default: str = DEFAULT_LANE):
+        self.lanes = tuple(lanes)
+        self._by_type: Dict[str, Lane] = {t: lane for lane in self.lanes for t in lane.types}
+        by_name = {lane.name: lane for lane in self.lanes}
+        self.default = by_name.get(default) or max(self.lanes, key=lambda lane: lane.target)
+
+    def lane_for(self, notification_type: str) -> Lane:
+        return self._by_type.get(notification_type, self.default)
+
+
+class LaneQueue(asyncio.Queue):
+    """
+    Черга воркера, що видає сповіщення за найближчим дедлайном
+    (`enqueued_at + target` їхньої смуги) замість порядку надходження.
+
+    Елементи — кортежі `(enqueued_at, notification)`, як у звичайній черзі сервісу.
+    У межах смуги порядок надходження зберігається.
+    """
+
+    def __init__(self, router: LaneRouter, maxsize: int = 0):
+        self.router = router
+        super().__init__(maxsize)
+
+    def _init(self, maxsize: int) -> None:
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        self.lane_sizes: Dict[str, int] = {lane.name: 0 for lane in self.router.lanes}
+
+    def _put(self, item: tuple) -> None:
+        enqueued_at, notification = item
+        lane = self.router.lane_for(notification.get('type'))
+        self.lane_sizes[lane.name] = self.lane_sizes.get(lane.name, 0) + 1
+        heapq.heappush(self._queue, (enqueued_at + lane.target, next(self._sequence), lane.name, item))
+
+    def _get(self) -> tuple:
+        _, _, lane_name, item = heapq.heappop(self._queue)
+        self.lane_sizes[lane_name] -= 1
+        return item
+
+
+# Смуги з NOTIFICATION_LANES або стандартні
+lane_router = LaneRouter(_lanes_from_env())
@@ -36,18 +36,13 @@ class Localization:
 
         return translations
 
-    def get_text(self, key: str, lang_code: str, **kwargs: Any) -> str:
+    def get_template(self, key: str, lang_code: str) -> str:
         """
-        Retrieves a translated string for a given key and language.
-
-        Args:
-            key: The key for the desired string (e.g., 'welcome_message').
-            lang_code: The language code (e.g., 'en', 'uk').
-            **kwargs: Placeholder values to format into the string.
+        Retrieves the raw translated string for a given key and language,
+        with its placeholders left unformatted.
 
-        Returns:
-            The translated and formatted string. Falls back to the default
-            language if the key or language is not found.
+        Falls back to the default language if the key or language is not found,
+        and to the key itself as a last resort.
         """
         # Fallback to default language if the requested language doesn't exist
         lang_dict = self.translations.get(lang_code)
@@ -60,6 +55,22 @@ class Localization:
         if text is None:
             logger.warning(f"Key '{key}' not found for language '{lang_code}'. Falling back to default language.")
             text = self.translations.get(self.default_lang, {}).get(key, key) # Return the key itself as a final fallback
+        return text
+
+    def get_text(self, key: str, lang_code: str, **kwargs: Any) -> str:
+        """
+        Retrieves a translated string for a given key and language.
+
+        Args:
+            key: The key for the desired string (e.g., 'welcome_message').
+            lang_code: The language code (e.g., 'en', 'uk').
+            **kwargs: Placeholder values to format into the string.
+
+        Returns:
+            The translated and formatted string. Falls back to the default
+            language if the key or language is not found.
+        """
+        text = self.get_template(key, lang_code)
 
         # Format the string with any provided keyword arguments
         try:
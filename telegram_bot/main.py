@@ -2,6 +2,10 @@ import os
 import logging
 from dotenv import load_dotenv
 
+# Load environment variables before importing the bot modules: they read
+# their settings (API_*, NOTIFICATION_*, ...) at import time
+load_dotenv()
+
 from telegram import BotCommand, MenuButtonCommands
 from telegram.ext import (
     Application,
@@ -15,11 +19,10 @@ from telegram.ext import (
 
 import handlers
 import api
+from instrumentation import InstrumentedRequest, instrument_handlers
+from metrics import METRICS_PORT, start_metrics_server
 from notification_service import NotificationService
 
-# Load environment variables
-load_dotenv()
-
 # Enable logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
@@ -81,6 +84,7 @@ def main() -> None:
     application = (
         Application.builder()
         .token(token)
+        .request(InstrumentedRequest(connection_pool_size=256))
         .post_init(post_init)
         .post_shutdown(post_shutdown)
         .build()
@@ -104,10 +108,11 @@ def main() -> None:
                 CallbackQueryHandler(handlers.handle_order_action, pattern='^(complete|revision|start)_'),
                 CallbackQueryHandler(handlers.view_chat, pattern='^chat_'),
                 CallbackQueryHandler(handlers.back_to_main, pattern='^back_to_main$'),
-                CallbackQueryHandler(handlers.my_orders, pattern='^my_orders$'),
+                CallbackQueryHandler(handlers.my_orders, pattern='^(my_orders|orders_page_.*)$'),
             ],
             handlers.CHAT_MENU: [
                 CallbackQueryHandler(handlers.view_chat, pattern='^chat_'),
+                CallbackQueryHandler(handlers.view_chat_history, pattern='^history_'),
                 CallbackQueryHandler(handlers.send_message_prompt, pattern='^send_msg_'),
                 CallbackQueryHandler(handlers.view_order, pattern='^order_'),
                 CallbackQueryHandler(handlers.chat_list, pattern='^messages$'),
@@ -143,20 +148,35 @@ def main() -> None:
     # Add error handler
     application.add_error_handler(handlers.error_handler)
 
+    # Record execution time of every handler for the /metrics endpoint
+    instrument_handlers(application)
+
     # Initialize and start notification service
     # Використовуємо BACKEND_INTERNAL_URL для локальних запитів без аутентифікації
     backend_url = os.getenv("BACKEND_INTERNAL_URL", "http://localhost:3000/v1")
     notification_service = NotificationService(application.bot, backend_url)
+    # Handlers use it to invalidate cached chat ids when an account gets linked
+    application.bot_data["notification_service"] = notification_service
     
     async def start_notification_service(app):
-        """Start notification service after bot initialization"""
+        """Start notification service and metrics endpoint after bot initialization"""
+        await post_init(app)
+        if METRICS_PORT > 0:
+            try:
+                app.bot_data["metrics_runner"] = await start_metrics_server()
+            except OSError as e:
+                logger.error(f"Failed to start metrics endpoint: {e}")
         await notification_service.start()
         logger.info("Notification service initialized")
     
     async def stop_notification_service(app):
-        """Stop notification service on shutdown"""
+        """Stop notification service and metrics endpoint on shutdown"""
         await notification_service.stop()
         logger.info("Notification service stopped")
+        metrics_runner = app.bot_data.pop("metrics_runner", None)
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await post_shutdown(app)
     
     application.post_init = start_notification_service
     application.post_shutdown = stop_notification_service
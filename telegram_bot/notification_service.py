@@ -1,23 +1,240 @@
 import os
+import time
+import socket
 import logging
 import asyncio
 import aiohttp
-from typing import Optional, Callable
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Callable, Set, Tuple
 from telegram import Bot
 
+import codec
+import sse
+from ack_batcher import AckBatcher
+from backlog import BacklogProgress
+from cache import TTLCache
+from digest import DigestCoalescer
+from http_pool import ConnectionStats, PoolConfig, create_session
+from lanes import LaneQueue, lane_router
+from metrics import registry
+from outbox import NotificationOutbox
+from pipeline_stats import PipelineSummary
+from resilience import backoff_delay
+
 logger = logging.getLogger(__name__)
 
+# Кількість паралельних воркерів доставки та розмір черги кожного з них
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "8"))
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "1000"))
+# Кеш userId -> chat_id: розмір, час життя та час життя "негативних" записів (користувач без чату)
+CHAT_ID_CACHE_SIZE = int(os.getenv("CHAT_ID_CACHE_SIZE", "10000"))
+CHAT_ID_CACHE_TTL = float(os.getenv("CHAT_ID_CACHE_TTL", "3600"))
+CHAT_ID_NEGATIVE_TTL = float(os.getenv("CHAT_ID_NEGATIVE_TTL", "60"))
+# Позначка в кеші для користувачів без прив'язаного чату
+_NO_CHAT = ""
+
+# Підтвердження доставки відправляються пачками: за розміром або за часом (секунди)
+ACK_BATCH_SIZE = int(os.getenv("NOTIFICATION_ACK_BATCH_SIZE", "50"))
+ACK_BATCH_DELAY = float(os.getenv("NOTIFICATION_ACK_BATCH_DELAY", "1.0"))
+# Скільки поодиноких PATCH виконується одночасно, якщо бекенд не підтримує пакетне підтвердження
+ACK_FALLBACK_CONCURRENCY = 8
+
+# Сповіщення для одного чату, що надійшли протягом вікна (секунди), об'єднуються в один дайджест;
+# 0 вимикає об'єднання. Дайджест відправляється раніше, якщо набралося DIGEST_MAX_ITEMS сповіщень
+DIGEST_WINDOW = float(os.getenv("NOTIFICATION_DIGEST_WINDOW", "2"))
+DIGEST_MAX_ITEMS = int(os.getenv("NOTIFICATION_DIGEST_MAX_ITEMS", "10"))
+
+# Локальний журнал доставки: не дає надіслати сповіщення двічі і дозволяє
+# підтвердити доставлене після перезапуску. Записи зберігаються OUTBOX_RETENTION секунд
+OUTBOX_PATH = os.getenv("NOTIFICATION_OUTBOX_PATH", "notification_outbox.sqlite3")
+OUTBOX_RETENTION = float(os.getenv("NOTIFICATION_OUTBOX_RETENTION", "86400"))
+
+# Таймаут запиту списку сповіщень (секунди)
+POLL_TIMEOUT = float(os.getenv("NOTIFICATION_POLL_TIMEOUT", "30"))
+# Адаптивне опитування: поки приходять нові сповіщення, опитуємо одразу;
+# без них інтервал подвоюється від мінімального до максимального (секунди)
+POLL_MIN_INTERVAL = float(os.getenv("NOTIFICATION_POLL_MIN_INTERVAL", "0.25"))
+POLL_MAX_INTERVAL = float(os.getenv("NOTIFICATION_POLL_MAX_INTERVAL", "5"))
+# Скільки секунд бекенд може тримати порожній запит (?wait=); 0 вимикає long polling
+LONG_POLL_WAIT = float(os.getenv("NOTIFICATION_LONG_POLL_WAIT", "25"))
+
+# Push-доставка через Server-Sent Events (/notifications/telegram-stream).
+# Якщо стрім недоступний, сервіс опитує бекенд і пробує підключитися знову через STREAM_RETRY_INTERVAL
+NOTIFICATION_STREAM = os.getenv("NOTIFICATION_STREAM", "true").lower() == "true"
+STREAM_RETRY_INTERVAL = float(os.getenv("NOTIFICATION_STREAM_RETRY", "60"))
+# Поки стрім активний, раз на цей інтервал звіряємося з /pending-telegram,
+# щоб підхопити сповіщення, які не вдалося доставити з першого разу
+STREAM_RECONCILE_INTERVAL = float(os.getenv("NOTIFICATION_STREAM_RECONCILE", "60"))
+# Сервер шле heartbeat кожні 15 с; довша тиша означає, що з'єднання мертве
+STREAM_READ_TIMEOUT = float(os.getenv("NOTIFICATION_STREAM_READ_TIMEOUT", "45"))
+# Стрім, що пропрацював довше, вважається стабільним і скидає лічильник перепідключень
+STREAM_STABLE_AFTER = 30.0
+
+# Кілька екземплярів бота: сповіщення беруться в оренду через /notifications/telegram-claim,
+# тож кожне обробляє лише один екземпляр. Стрім у цьому режимі не використовується
+NOTIFICATION_CLAIM = os.getenv("NOTIFICATION_CLAIM", "false").lower() == "true"
+CLAIM_BATCH = int(os.getenv("NOTIFICATION_CLAIM_BATCH", "100"))
+# Тривалість оренди (секунди); кожен наступний запит подовжує оренду вже взятих сповіщень
+CLAIM_LEASE = float(os.getenv("NOTIFICATION_CLAIM_LEASE", "60"))
+# Бекенд повертає не більше стількох сповіщень за один запит
+CLAIM_MAX_BATCH = 500
+# Стабільний id екземпляра дозволяє після перезапуску одразу підхопити власні оренди
+REPLICA_ID = os.getenv("NOTIFICATION_REPLICA_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+# Звичайний запит /pending-telegram повертає не більше стількох сповіщень;
+# повна відповідь означає, що на бекенді накопичилася черга
+PENDING_PAGE_SIZE = 100
+# Накопичена черга (після простою або на старті) розбирається сторінками по CATCHUP_PAGE_SIZE,
+# а прогрес пишеться в лог раз на CATCHUP_PROGRESS_INTERVAL секунд
+CATCHUP_PAGE_SIZE = int(os.getenv("NOTIFICATION_CATCHUP_PAGE_SIZE", "500"))
+CATCHUP_PROGRESS_INTERVAL = float(os.getenv("NOTIFICATION_CATCHUP_PROGRESS_INTERVAL", "10"))
+# Сповіщення, старші за STALE_AFTER секунд, не відправляються окремо: вони збираються
+# в підсумковий дайджест чату протягом STALE_DIGEST_WINDOW секунд (до STALE_DIGEST_MAX_ITEMS).
+# 0 вимикає; сповіщення смуг без дайджестів (термінові) завжди відправляються окремо
+STALE_AFTER = float(os.getenv("NOTIFICATION_STALE_AFTER", "0"))
+STALE_DIGEST_WINDOW = float(os.getenv("NOTIFICATION_STALE_DIGEST_WINDOW", "30"))
+STALE_DIGEST_MAX_ITEMS = int(os.getenv("NOTIFICATION_STALE_DIGEST_MAX_ITEMS", "20"))
+
+# Повтори після тимчасових помилок відправки (таймаути, мережа, flood control): затримка росте
+# експоненційно від RETRY_BASE_DELAY до RETRY_MAX_DELAY секунд. Після RETRY_MAX_ATTEMPTS невдалих спроб,
+# як і після постійної помилки (бот заблокований, чату не існує), сповіщення переноситься в dead letters
+RETRY_BASE_DELAY = float(os.getenv("NOTIFICATION_RETRY_BASE_DELAY", "5"))
+RETRY_MAX_DELAY = float(os.getenv("NOTIFICATION_RETRY_MAX_DELAY", "3600"))
+RETRY_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_RETRY_MAX_ATTEMPTS", "10"))
+
+# Раз на стільки секунд у лог пишеться підсумок конвеєра (швидкість, помилки, затримка, черги); 0 вимикає
+STATS_INTERVAL = float(os.getenv("NOTIFICATION_STATS_INTERVAL", "60"))
+
+QUEUE_DEPTH = registry.gauge(
+    "hiwwer_bot_notification_queue_depth", "Notifications waiting in the dispatch queues."
+)
+HTTP_CONNECTIONS = registry.counter(
+    "hiwwer_bot_notification_http_connections_total", "Connections opened or reused by the notification service session.", ["kind"]
+)
+CHAT_ID_CACHE = registry.counter(
+    "hiwwer_bot_chat_id_cache_lookups_total", "userId -> chat_id cache lookups by result.", ["result"]
+)
+CHAT_ID_CACHE_HIT_RATIO = registry.gauge(
+    "hiwwer_bot_chat_id_cache_hit_ratio", "Fraction of userId -> chat_id lookups served from the cache."
+)
+STAGE_LATENCY = registry.histogram(
+    "hiwwer_bot_notification_stage_duration_seconds",
+    "Time spent in each notification dispatch stage (receive, queue_wait, chat_lookup, send, ack).",
+    ["stage"],
+)
+LANE_DEPTH = registry.gauge(
+    "hiwwer_bot_notification_lane_depth", "Notifications waiting in the dispatch queues by priority lane.", ["lane"]
+)
+LANE_LAG = registry.histogram(
+    "hiwwer_bot_notification_lane_lag_seconds",
+    "Time from notification creation on the backend to delivery in Telegram, by priority lane.",
+    ["lane"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+BACKLOG_REMAINING = registry.gauge(
+    "hiwwer_bot_notification_backlog_remaining", "Backlogged notifications not yet processed by the running catch-up."
+)
+NOTIFICATIONS_SENT = registry.counter(
+    "hiwwer_bot_notifications_sent_total", "Notifications delivered to Telegram, by priority lane.", ["lane"]
+)
+PIPELINE_BACKLOG = registry.gauge(
+    "hiwwer_bot_notification_backlog",
+    "Notifications not yet done, by where they wait (queued, digest, unacknowledged, backend).",
+    ["stage"],
+)
+DELIVERY_FAILURES = registry.counter(
+    "hiwwer_bot_notification_delivery_failures_total",
+    "Notifications whose delivery failed, by reason and outcome (retry or dead_letter).",
+    ["reason", "outcome"],
+)
+STALE_DIGESTED = registry.counter(
+    "hiwwer_bot_notification_stale_digested_total", "Notifications older than NOTIFICATION_STALE_AFTER folded into digests."
+)
+
+
+def _notification_age(notification: dict) -> Optional[float]:
+    """Скільки секунд минуло від створення сповіщення на бекенді (createdAt)"""
+    created_at = notification.get('createdAt')
+    if not created_at:
+        return None
+    try:
+        created = datetime.fromisoformat(str(created_at).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return max(0.0, (datetime.now(timezone.utc) - created).total_seconds())
+
+
+async def _iterate(items: List[dict]) -> AsyncIterator[dict]:
+    for item in items:
+        yield item
+
+
 class NotificationService:
     """
     Сервіс для отримання та обробки сповіщень з бекенду.
-    Використовує long polling для отримання нових сповіщень.
+    Отримує нові сповіщення через Server-Sent Events, а якщо стрім недоступний — long polling.
     """
     
-    def __init__(self, bot: Bot, backend_url: str):
+    def __init__(self, bot: Bot, backend_url: str, workers: int = NOTIFICATION_WORKERS, outbox_path: str = OUTBOX_PATH):
         self.bot = bot
         self.backend_url = backend_url
         self.running = False
         self._task: Optional[asyncio.Task] = None
+        # id останньої події стріму, з якої продовжуємо після перепідключення
+        self._last_event_id: Optional[str] = None
+        # Кожен воркер має власну чергу; сповіщення одного користувача завжди
+        # потрапляють в одну чергу, тож порядок у межах чату зберігається
+        self.workers = max(1, workers)
+        self._queues: List[asyncio.Queue] = []
+        self._worker_tasks: List[asyncio.Task] = []
+        # id сповіщень, що вже в черзі або обробляються, щоб повторне опитування їх не дублювало
+        self._in_flight: Set[str] = set()
+        # Одна довгоживуча сесія з пулом з'єднань для опитування, chat_id та підтверджень
+        self.pool_config = PoolConfig("NOTIFICATION", limit_per_host=self.workers * 2 + 2)
+        self.connection_stats = ConnectionStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._chat_ids = TTLCache(max_entries=CHAT_ID_CACHE_SIZE)
+        self._outbox = NotificationOutbox(outbox_path, retention=OUTBOX_RETENTION)
+        # Доставлені сповіщення лишаються в _in_flight, доки їх не підтверджено на бекенді,
+        # інакше наступне опитування поверне їх знову і вони будуть відправлені вдруге
+        self._acks = AckBatcher(
+            self._acknowledge,
+            on_acknowledged=self._on_acknowledged,
+            max_batch=ACK_BATCH_SIZE,
+            max_delay=ACK_BATCH_DELAY,
+        )
+        self._bulk_ack_supported = True
+        # Недоставні сповіщення повідомляються бекенду пачками, як і підтвердження
+        self._dead_letters = AckBatcher(
+            self._report_dead_letters,
+            on_acknowledged=self._on_dead_letters_reported,
+            max_batch=ACK_BATCH_SIZE,
+            max_delay=ACK_BATCH_DELAY,
+        )
+        # Чи підтримує бекенд PATCH /notifications/telegram-failed
+        self._failure_reports_supported = True
+        # Чи підтримує бекенд сторінки /pending-telegram (limit, cursor); старий завжди віддає першу сотню
+        self._paging_supported = True
+        self._backlog_detected = False
+        self._backlog: Optional[BacklogProgress] = None
+        self._claiming = NOTIFICATION_CLAIM
+        self.replica_id = REPLICA_ID
+        self._digests = DigestCoalescer(self._deliver, window=DIGEST_WINDOW, max_items=DIGEST_MAX_ITEMS)
+        self._stale_digests = DigestCoalescer(self._deliver, window=STALE_DIGEST_WINDOW, max_items=STALE_DIGEST_MAX_ITEMS)
+        QUEUE_DEPTH.set_function(self.queue_depth)
+        BACKLOG_REMAINING.set_function(lambda: self._backlog.remaining if self._backlog else 0)
+        for stage in ("queued", "digest", "unacknowledged", "backend"):
+            PIPELINE_BACKLOG.set_function(lambda stage=stage: self.backlog_sizes()[stage], stage=stage)
+        self._stats_task: Optional[asyncio.Task] = None
+        for lane in lane_router.lanes:
+            LANE_DEPTH.set_function(lambda name=lane.name: self.lane_depth(name), lane=lane.name)
+        CHAT_ID_CACHE.set_function(lambda: self._chat_ids.hits, result="hit")
+        CHAT_ID_CACHE.set_function(lambda: self._chat_ids.misses, result="miss")
+        CHAT_ID_CACHE_HIT_RATIO.set_function(lambda: self._chat_ids.stats()["hit_ratio"])
+        HTTP_CONNECTIONS.set_function(lambda: self.connection_stats.created, kind="created")
+        HTTP_CONNECTIONS.set_function(lambda: self.connection_stats.reused, kind="reused")
         
     async def start(self):
         """Запускає сервіс отримання сповіщень"""
@@ -26,107 +243,667 @@ class NotificationService:
             return
             
         self.running = True
-        self._task = asyncio.create_task(self._poll_notifications())
-        logger.info("Notification service started")
+        # Черги видають сповіщення за пріоритетом смуги (lanes.py), а не в порядку надходження
+        self._queues = [LaneQueue(lane_router, maxsize=NOTIFICATION_QUEUE_SIZE) for _ in range(self.workers)]
+        self._worker_tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        self._acks.start()
+        self._dead_letters.start()
+        await self._resume_from_outbox()
+        self._task = asyncio.create_task(self._receive_notifications())
+        if STATS_INTERVAL > 0:
+            self._stats_task = asyncio.create_task(self._report_stats())
+        logger.info(f"Notification service started with {self.workers} workers")
+
+    async def _resume_from_outbox(self):
+        """Підтверджує доставлене до перезапуску і продовжує доставку невідправленого"""
+        unacknowledged = self._outbox.unacknowledged()
+        for notification_id in unacknowledged:
+            self._in_flight.add(notification_id)
+            self._acks.add(notification_id)
+        dead_letters = self._outbox.dead_letters()
+        for notification_id in dead_letters:
+            self._in_flight.add(notification_id)
+            self._dead_letters.add(notification_id)
+        pending = self._outbox.pending()
+        for notification in pending:
+            await self._enqueue(notification)
+        if unacknowledged or dead_letters or pending:
+            logger.info(f"Resumed from outbox: {len(unacknowledged)} to acknowledge, "
+                        f"{len(dead_letters)} dead letters to report, {len(pending)} to send")
         
     async def stop(self):
         """Зупиняє сервіс отримання сповіщень"""
         self.running = False
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+        tasks = [task for task in (self._task, self._stats_task) if task] + self._worker_tasks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        # Відправляємо дайджести, що ще збираються, а потім підтверджуємо все доставлене
+        await self._digests.stop()
+        await self._stale_digests.stop()
+        # Підтверджуємо все доставлене, щоб після перезапуску не надіслати його повторно
+        await self._acks.stop()
+        await self._dead_letters.stop()
+        self._in_flight.clear()
+        self._outbox.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
         logger.info("Notification service stopped")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Повертає спільну сесію, створюючи її в поточному event loop за потреби"""
+        if self._session is None or self._session.closed:
+            self._session = create_session(self.pool_config, self.connection_stats)
+        return self._session
+
+    def invalidate_chat_id(self, user_id: str):
+        """Видаляє chat_id користувача з кешу (наприклад, після прив'язки акаунта)"""
+        self._chat_ids.invalidate(user_id)
+
+    def chat_id_cache_stats(self) -> dict:
+        """Статистика влучань кешу chat_id"""
+        return self._chat_ids.stats()
+
+    def queue_depth(self) -> int:
+        """Кількість сповіщень, що очікують у чергах воркерів"""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def lane_depth(self, lane: str) -> int:
+        """Кількість сповіщень смуги, що очікують у чергах воркерів"""
+        return sum(queue.lane_sizes.get(lane, 0) for queue in self._queues)
+
+    def backlog_sizes(self) -> Dict[str, int]:
+        """
+        Скільки сповіщень ще не завершено: у чергах воркерів, у дайджестах, що збираються,
+        доставлених, але не підтверджених, і ще не прочитаних з бекенду під час розбору черги
+        """
+        return {
+            "queued": self.queue_depth(),
+            "digest": len(self._digests) + len(self._stale_digests),
+            "unacknowledged": len(self._acks),
+            "backend": self._backlog.remaining if self._backlog else 0,
+        }
+
+    async def _report_stats(self):
+        """Періодично пише в лог підсумок конвеєра"""
+        from notifications import SEND_FAILURES
+
+        summary = PipelineSummary(NOTIFICATIONS_SENT, SEND_FAILURES, LANE_LAG, self.backlog_sizes)
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            try:
+                summary.report()
+            except Exception as e:
+                logger.error(f"Error reporting notification pipeline stats: {e}")
+
+    async def _enqueue(self, notification: dict) -> bool:
+        """
+        Ставить сповіщення в чергу воркера, що відповідає його користувачу.
+        Повертає False, якщо сповіщення вже в обробці, вже було відправлене,
+        недоставне або ще не настав час наступної спроби.
+        """
+        notification_id = notification.get('id')
+        if notification_id in self._in_flight:
+            return False
+        entry = self._outbox.record(notification)
+        if entry.state == NotificationOutbox.PENDING and entry.retry_at > time.time():
+            # Старий бекенд не знає про відкладені повтори і повертає сповіщення раніше часу
+            return False
+        self._in_flight.add(notification_id)
+        if entry.state in (NotificationOutbox.DEAD, NotificationOutbox.DEAD_REPORTED):
+            # Бекенд досі повертає недоставне сповіщення — повідомляємо його ще раз
+            self._dead_letters.add(notification_id)
+            return False
+        if entry.state != NotificationOutbox.PENDING:
+            # Вже відправлене, але бекенд досі його повертає — лише підтверджуємо ще раз
+            logger.debug(f"Notification {notification_id} was already sent, acknowledging it again")
+            self._acks.add(notification_id)
+            return False
+        age = _notification_age(notification)
+        if age is not None:
+            # Затримка між створенням сповіщення на бекенді та його отриманням ботом
+            STAGE_LATENCY.observe(age, stage="receive")
+        queue = self._queues[hash(notification.get('userId')) % len(self._queues)]
+        await queue.put((time.monotonic(), notification))
+        return True
+
+    async def _worker(self, queue: asyncio.Queue):
+        """Послідовно обробляє сповіщення зі своєї черги"""
+        while True:
+            enqueued_at, notification = await queue.get()
+            delivered = False
+            try:
+                STAGE_LATENCY.observe(time.monotonic() - enqueued_at, stage="queue_wait")
+                delivered = await self._process_notification(notification)
+            finally:
+                if not delivered:
+                    self._in_flight.discard(notification.get('id'))
+                queue.task_done()
         
-    async def _poll_notifications(self):
-        """
-        Періодично перевіряє нові сповіщення на бекенді.
-        В ідеалі потрібно використовувати WebSocket або Server-Sent Events.
-        """
-        async with aiohttp.ClientSession() as session:
-            while self.running:
-                try:
-                    # Отримуємо список непрочитаних сповіщень
-                    async with session.get(
-                        f"{self.backend_url}/notifications/pending-telegram",
-                        timeout=aiohttp.ClientTimeout(total=30)
-                    ) as response:
-                        if response.status == 200:
-                            notifications = await response.json()
-                            
-                            # Обробляємо кожне сповіщення
-                            for notification in notifications:
-                                await self._process_notification(notification)
-                                
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    logger.error(f"Error polling notifications: {e}")
-                    
-                # Чекаємо перед наступною перевіркою (5 секунд)
-                await asyncio.sleep(5)
-                
-    async def _process_notification(self, notification: dict):
-        """Обробляє одне сповіщення та відправляє його користувачу"""
+    async def _receive_notifications(self):
+        """
+        Отримує сповіщення зі стріму, перепідключаючись після обривів.
+        Поки стрім недоступний, працює звичайне опитування.
+        Спершу розбирає чергу, що накопичилася на бекенді, поки бот не працював.
+        """
+        if not self._claiming:
+            await self._catch_up()
+        if not NOTIFICATION_STREAM or self._claiming:
+            await self._poll_notifications()
+            return
+
+        attempt = 0
+        while self.running:
+            connected_at = time.monotonic()
+            if await self._consume_stream():
+                if time.monotonic() - connected_at > STREAM_STABLE_AFTER:
+                    attempt = 0
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+            else:
+                logger.info(f"Notification stream unavailable, polling for {STREAM_RETRY_INTERVAL:g}s")
+                await self._poll_notifications(until=time.monotonic() + STREAM_RETRY_INTERVAL)
+
+    async def _consume_stream(self) -> bool:
+        """
+        Читає стрім /notifications/telegram-stream, доки він не закриється.
+        Повертає True, якщо підключення вдалося (тоді варто одразу перепідключитися).
+        """
+        headers = {"Accept": "text/event-stream"}
+        if self._last_event_id:
+            headers["Last-Event-ID"] = self._last_event_id
+        timeout = aiohttp.ClientTimeout(
+            total=None, connect=self.pool_config.connect_timeout, sock_read=STREAM_READ_TIMEOUT
+        )
+        connected = False
+        reconcile: Optional[asyncio.Task] = None
+        try:
+            async with self._get_session().get(
+                f"{self.backend_url}/notifications/telegram-stream",
+                headers=headers,
+                timeout=timeout
+            ) as response:
+                if response.status != 200 or response.content_type != "text/event-stream":
+                    logger.warning(f"Notification stream rejected with status {response.status}")
+                    return False
+                connected = True
+                logger.info("Connected to notification stream")
+                reconcile = asyncio.create_task(self._reconcile())
+
+                async for event in sse.iter_events(response):
+                    if event.event != "notification":
+                        continue
+                    await self._enqueue(codec.loads(event.data.encode()))
+                    if event.id:
+                        self._last_event_id = event.id
+            logger.info("Notification stream closed by the backend")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Notification stream error: {e}")
+        finally:
+            if reconcile is not None:
+                reconcile.cancel()
+        return connected
+
+    async def _reconcile(self):
+        """Періодично звіряється з /pending-telegram, поки активний стрім"""
+        while True:
+            await asyncio.sleep(STREAM_RECONCILE_INTERVAL)
+            try:
+                queued, _ = await self._poll_once(wait=0)
+                if queued:
+                    logger.info(f"Reconciliation picked up {queued} notifications missed by the stream")
+                if self._backlog_detected:
+                    await self._catch_up()
+            except Exception as e:
+                logger.error(f"Error reconciling notifications: {e}")
+
+    async def _poll_notifications(self, until: Optional[float] = None):
+        """
+        Опитує бекенд на нові сповіщення з адаптивним інтервалом.
+        Поки приходять нові сповіщення, наступний запит йде одразу; коли їх немає,
+        інтервал подвоюється до POLL_MAX_INTERVAL. Якщо бекенд підтримує long polling,
+        порожні відповіді він і так затримує, тому повторюємо запит без паузи.
+        Якщо задано `until`, опитування припиняється після цього моменту (time.monotonic()).
+        Якщо бекенд віддав повну сторінку, черга розбирається сторінками (_catch_up).
+        """
+        interval = POLL_MIN_INTERVAL
+        while self.running and (until is None or time.monotonic() < until):
+            try:
+                queued, held = await self._poll_once()
+                if self._backlog_detected:
+                    await self._catch_up()
+                    queued = True
+                if queued or held:
+                    interval = POLL_MIN_INTERVAL
+                    continue
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error polling notifications: {e}")
+
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, POLL_MAX_INTERVAL)
+
+    async def _poll_once(self, wait: float = LONG_POLL_WAIT) -> Tuple[int, bool]:
+        """
+        Один запит за новими сповіщеннями (оренда або /pending-telegram).
+        Повертає (кількість нових сповіщень у черзі, чи тримав бекенд порожній запит).
+        """
+        if self._claiming:
+            notifications, held = await self._claim(wait)
+        else:
+            notifications, held = await self._fetch_pending(wait)
+
+        # Розподіляємо сповіщення між воркерами
+        queued = 0
+        for notification in notifications:
+            if await self._enqueue(notification):
+                queued += 1
+        # Повна сторінка лише нових сповіщень: за нею, ймовірно, ще ціла черга
+        self._backlog_detected = (
+            not self._claiming and self._paging_supported and queued >= PENDING_PAGE_SIZE
+        )
+        return queued, held
+
+    async def _fetch_pending(self, wait: float) -> Tuple[List[dict], bool]:
+        """Запит до /notifications/pending-telegram"""
+        params = {"wait": f"{wait:g}"} if wait > 0 else None
+        async with self._get_session().get(
+            f"{self.backend_url}/notifications/pending-telegram",
+            params=params,
+            timeout=self.pool_config.timeout(POLL_TIMEOUT + wait)
+        ) as response:
+            if response.status != 200:
+                logger.warning(f"Polling notifications failed with status {response.status}")
+                return [], False
+            notifications = codec.loads(await response.read()) or []
+            # Бекенд без підтримки ?wait= не повертає цей заголовок і відповідає одразу
+            return notifications, not notifications and "X-Long-Poll-Wait" in response.headers
+
+    async def _catch_up(self):
+        """
+        Розбирає накопичену на бекенді чергу, не завантажуючи її в пам'ять цілком.
+        /pending-telegram читається сторінками з курсором (id останнього сповіщення),
+        кожна сторінка розбирається рядок за рядком (NDJSON), а наступна запитується,
+        лише коли в чергах воркерів є для неї місце. Спершу вибираються смуги,
+        терміновіші за стандартну, потім решта сповіщень від найстаріших.
+        """
+        self._backlog_detected = False
+        urgent = [
+            lane.types for lane in sorted(lane_router.lanes, key=lambda lane: lane.target)
+            if lane.types and lane.target < lane_router.default.target
+        ]
+        # Останній прохід пропускає термінові типи, інакше вже прочитані сповіщення порахувалися б двічі
+        passes = [(types, ()) for types in urgent] + [((), tuple(t for types in urgent for t in types))]
+        page_size = max(1, min(CATCHUP_PAGE_SIZE, self.workers * NOTIFICATION_QUEUE_SIZE // 2))
+        progress = self._backlog = BacklogProgress(interval=CATCHUP_PROGRESS_INTERVAL)
+        try:
+            for types, exclude in passes:
+                cursor, more = None, True
+                while more and self.running and self._paging_supported:
+                    await self._wait_for_capacity(page_size)
+                    cursor, more = await self._fetch_page(progress, page_size, cursor, types, exclude)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Решту черги підхопить звичайне опитування і знову перейде в цей режим
+            logger.error(f"Error catching up on notification backlog: {e}")
+        finally:
+            self._backlog = None
+        if progress.processed:
+            progress.finish()
+
+    async def _wait_for_capacity(self, size: int):
+        """Чекає, доки в чергах воркерів звільниться місце для ще `size` сповіщень"""
+        capacity = self.workers * NOTIFICATION_QUEUE_SIZE
+        while self.running and self.queue_depth() + size > capacity:
+            await asyncio.sleep(POLL_MIN_INTERVAL)
+
+    async def _fetch_page(
+        self, progress: BacklogProgress, limit: int, cursor: Optional[str],
+        types: Tuple[str, ...], exclude: Tuple[str, ...] = ()
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Ставить у черги одну сторінку накопичених сповіщень після `cursor`
+        (лише типів `types`, якщо задано, і без типів `exclude`).
+        Повертає (новий курсор, чи є ще сторінки).
+        """
+        params = {"limit": str(limit)}
+        if cursor:
+            params["cursor"] = cursor
+        if types:
+            params["types"] = ",".join(types)
+        if exclude:
+            params["excludeTypes"] = ",".join(exclude)
+        if progress.total is None:
+            params["count"] = "1"
+        # Поки воркери розбирають черги, читання сторінки може призупинятися, тож обмежуємо лише паузи між даними
+        timeout = aiohttp.ClientTimeout(total=None, connect=self.pool_config.connect_timeout, sock_read=POLL_TIMEOUT)
+        async with self._get_session().get(
+            f"{self.backend_url}/notifications/pending-telegram",
+            params=params,
+            headers={"Accept": "application/x-ndjson"},
+            timeout=timeout
+        ) as response:
+            if response.status != 200:
+                logger.warning(f"Fetching notification backlog failed with status {response.status}")
+                return cursor, False
+            if "count" in params:
+                if "X-Pending-Count" in response.headers:
+                    progress.total = int(response.headers["X-Pending-Count"])
+                else:
+                    # Старий бекенд ігнорує limit і cursor, тож розбираємо лише цю відповідь
+                    logger.info("The backend does not page pending notifications, backlog catch-up is disabled")
+                    self._paging_supported = False
+            more = "X-Next-Cursor" in response.headers
+            if response.content_type == "application/x-ndjson":
+                notifications = codec.iter_ndjson(response.content)
+            else:
+                notifications = _iterate(codec.loads(await response.read()) or [])
+            async for notification in notifications:
+                progress.advance(await self._enqueue(notification))
+                cursor = notification.get('id')
+                progress.report()
+        return cursor, more
+
+    async def _claim(self, wait: float) -> Tuple[List[dict], bool]:
+        """
+        Бере в оренду сповіщення через POST /notifications/telegram-claim.
+        Запит повертає і вже взяті цим екземпляром сповіщення, подовжуючи їхню оренду,
+        тому ліміт враховує ті, що ще в обробці.
+        """
+        body = {
+            "owner": self.replica_id,
+            "limit": min(CLAIM_BATCH + len(self._in_flight), CLAIM_MAX_BATCH),
+            "leaseSeconds": CLAIM_LEASE,
+            "wait": wait,
+        }
+        async with self._get_session().post(
+            f"{self.backend_url}/notifications/telegram-claim",
+            data=codec.dumps(body),
+            headers={"Content-Type": "application/json"},
+            timeout=self.pool_config.timeout(POLL_TIMEOUT + wait)
+        ) as response:
+            # Старий бекенд: маршрут не знайдено або запит потрапив під authenticate
+            if response.status in (401, 404, 405):
+                logger.error("Notification claiming is not supported by the backend, falling back to shared polling; "
+                             "several bot instances will now send duplicates")
+                self._claiming = False
+                return [], False
+            if response.status != 200:
+                logger.warning(f"Claiming notifications failed with status {response.status}")
+                return [], False
+            notifications = codec.loads(await response.read()) or []
+            return notifications, not notifications and "X-Long-Poll-Wait" in response.headers
+
+    async def _process_notification(self, notification: dict) -> bool:
+        """
+        Визначає чат сповіщення та передає його на доставку (одразу або через дайджест).
+        Повертає True, якщо сповіщення передано далі; тоді доставка сама підтверджує
+        його або знімає з обробки.
+        """
         try:
             user_id = notification.get('userId')
-            notification_id = notification.get('id')
-            notification_type = notification.get('type')
-            content = notification.get('content')
-            related_id = notification.get('relatedId')
             
-            # Отримуємо chat_id користувача з бази даних
-            chat_id = await self._get_user_chat_id(user_id)
+            # Бекенд повертає chat_id разом зі сповіщенням; інакше беремо його з кешу або API
+            chat_id = notification.get('chatId')
+            if chat_id:
+                self._chat_ids.set(user_id, chat_id, CHAT_ID_CACHE_TTL)
+            else:
+                with STAGE_LATENCY.time(stage="chat_lookup"):
+                    chat_id = await self._get_cached_chat_id(user_id)
             
             if not chat_id:
                 logger.warning(f"No chat_id found for user {user_id}")
-                return
-                
-            # Імпортуємо функцію відправки сповіщень
-            from notifications import send_telegram_notification
-            
-            # Відправляємо сповіщення в Telegram
-            success = await send_telegram_notification(
-                bot=self.bot,
-                chat_id=chat_id,
-                notification_type=notification_type,
-                content=content,
-                related_id=related_id
-            )
-            
-            if success:
-                # Відмічаємо сповіщення як відправлене в Telegram
-                await self._mark_notification_sent(notification_id)
+                return False
+
+            lane = lane_router.lane_for(notification.get('type'))
+            age = _notification_age(notification)
+            # Застарілі сповіщення збираються в підсумковий дайджест замість окремих повідомлень
+            if STALE_AFTER > 0 and lane.digest and age is not None and age > STALE_AFTER:
+                STALE_DIGESTED.inc()
+                self._stale_digests.add(chat_id, notification)
+            # Термінові смуги не чекають вікна дайджесту
+            elif DIGEST_WINDOW > 0 and lane.digest:
+                self._digests.add(chat_id, notification)
+            else:
+                await self._deliver(chat_id, [notification])
+            return True
                 
         except Exception as e:
             logger.error(f"Error processing notification {notification.get('id')}: {e}")
+            return False
+
+    async def _deliver(self, chat_id: str, notifications: List[dict]):
+        """
+        Відправляє сповіщення одного чату одним повідомленням (дайджестом, якщо їх кілька).
+        Кожне сповіщення підтверджується окремо; якщо відправка не вдалася,
+        наступна спроба відкладається (_handle_failure). Дайджест, текст якого
+        відхилив Telegram, відправляється заново по одному сповіщенню.
+        """
+        # Імпортуємо функцію відправки сповіщень
+        from notifications import send_telegram_digest
+
+        notification_ids = [notification.get('id') for notification in notifications]
+        lanes = [lane_router.lane_for(notification.get('type')) for notification in notifications]
+        # Під час перевантаження планувальник першими відправляє сповіщення термінових смуг
+        deadline = time.monotonic() + min(lane.target for lane in lanes)
+        # Фіксуємо початок відправки до виклику Telegram: після падіння посередині
+        # сповіщення вважатиметься доставленим, а не буде надіслане вдруге
+        self._outbox.mark_sending(notification_ids)
+        try:
+            # Відправляємо сповіщення в Telegram
+            with STAGE_LATENCY.time(stage="send"):
+                result = await send_telegram_digest(self.bot, chat_id, notifications, deadline=deadline)
+        except BaseException:
+            # Відправку перервано (зупинка сервісу), коли Telegram міг уже доставити повідомлення.
+            # Як і після падіння (NotificationOutbox.unacknowledged), вважаємо сповіщення доставленими:
+            # краще не надіслати повідомлення, ніж продублювати його
+            logger.warning(f"Sending {len(notification_ids)} notifications was interrupted, treating them as sent")
+            self._outbox.mark_sent(notification_ids)
+            for notification_id in notification_ids:
+                self._acks.add(notification_id)
+            raise
+
+        if not result:
+            if result.reason == "bad_request" and len(notifications) > 1:
+                # Telegram відхилив текст дайджесту — відправляємо сповіщення окремо,
+                # щоб одне зіпсоване не потягнуло за собою в dead letters решту
+                logger.warning(f"Digest of {len(notifications)} notifications rejected, sending them one by one")
+                for notification in notifications:
+                    await self._deliver(chat_id, [notification])
+                return
+            await self._handle_failure(notification_ids, result.reason or "unexpected", result.permanent)
+            return
+        self._outbox.mark_sent(notification_ids)
+        for notification, lane in zip(notifications, lanes):
+            NOTIFICATIONS_SENT.inc(lane=lane.name)
+            age = _notification_age(notification)
+            if age is not None:
+                LANE_LAG.observe(age, lane=lane.name)
+        # Відмічаємо сповіщення як відправлені в Telegram (пачкою, у фоні)
+        for notification_id in notification_ids:
+            self._acks.add(notification_id)
+
+    async def _handle_failure(self, notification_ids: List[str], reason: str, permanent: bool):
+        """
+        Невдала відправка. Після постійної помилки або RETRY_MAX_ATTEMPTS спроб сповіщення
+        переносяться в dead letters, про які дізнається бекенд. Інакше наступна спроба
+        відкладається з експоненційною затримкою: бекенд не повертає сповіщення до цього часу,
+        а outbox не дає відправити його раніше, навіть якщо бекенд цього не підтримує.
+        """
+        attempts = self._outbox.mark_failed(notification_ids, reason)
+        if permanent:
+            dead = set(notification_ids)
+        else:
+            dead = {notification_id for notification_id in notification_ids
+                    if attempts.get(notification_id, 0) >= RETRY_MAX_ATTEMPTS}
+
+        if dead:
+            self._outbox.mark_dead(dead, reason)
+            DELIVERY_FAILURES.inc(len(dead), reason=reason, outcome="dead_letter")
+            logger.warning(f"{len(dead)} notifications moved to dead letters: {reason}")
+            # Лишаються в обробці, доки бекенд не дізнається про них
+            for notification_id in dead:
+                self._dead_letters.add(notification_id)
+
+        retry = [notification_id for notification_id in notification_ids if notification_id not in dead]
+        if retry:
+            attempt = max(attempts.get(notification_id, 1) for notification_id in retry)
+            delay = max(RETRY_BASE_DELAY, backoff_delay(attempt - 1, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY))
+            self._outbox.defer(retry, time.time() + delay)
+            DELIVERY_FAILURES.inc(len(retry), reason=reason, outcome="retry")
+            logger.info(f"Retrying {len(retry)} notifications in {delay:.0f}s (attempt {attempt}): {reason}")
+            self._in_flight.difference_update(retry)
+            await self._report_failed(retry, reason, retry_after=delay)
             
+    async def _get_cached_chat_id(self, user_id: str) -> Optional[str]:
+        """Повертає chat_id з кешу, звертаючись до API лише при промаху"""
+        chat_id, _ = self._chat_ids.get(user_id)
+        if chat_id is not None:
+            return chat_id or None
+
+        chat_id = await self._get_user_chat_id(user_id)
+        if chat_id == _NO_CHAT:
+            # Бекенд підтвердив, що чат не прив'язаний — кешуємо це ненадовго
+            self._chat_ids.set(user_id, _NO_CHAT, CHAT_ID_NEGATIVE_TTL)
+            return None
+        if chat_id:
+            self._chat_ids.set(user_id, chat_id, CHAT_ID_CACHE_TTL)
+        return chat_id
+
     async def _get_user_chat_id(self, user_id: str) -> Optional[str]:
-        """Отримує chat_id користувача з бази даних через API"""
+        """
+        Отримує chat_id користувача з бази даних через API.
+        Повертає _NO_CHAT, якщо бекенд відповів, що чат не прив'язаний, і None у разі помилки.
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.backend_url}/users/{user_id}/telegram-chat",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get('chatId')
+            async with self._get_session().get(
+                f"{self.backend_url}/users/{user_id}/telegram-chat"
+            ) as response:
+                if response.status == 200:
+                    data = codec.loads(await response.read())
+                    return data.get('chatId') or _NO_CHAT
+                if response.status == 404:
+                    return _NO_CHAT
         except Exception as e:
             logger.error(f"Error getting chat_id for user {user_id}: {e}")
         return None
         
-    async def _mark_notification_sent(self, notification_id: str):
+    async def _report_dead_letters(self, notification_ids: List[str]) -> List[str]:
+        """
+        Повідомляє бекенду про недоставні сповіщення, щоб він більше їх не повертав.
+        Якщо бекенд цього не підтримує, сповіщення підтверджуються як відправлені:
+        інакше він повертатиме їх вічно. Повертає id, про які бекенд дізнався.
+        """
+        by_reason: Dict[str, List[str]] = {}
+        for notification_id, error in self._outbox.errors(notification_ids).items():
+            by_reason.setdefault(error or "unexpected", []).append(notification_id)
+        reported: List[str] = []
+        for reason, ids in by_reason.items():
+            if await self._report_failed(ids, reason):
+                reported.extend(ids)
+            elif not self._failure_reports_supported:
+                reported.extend(await self._acknowledge(ids))
+        return reported
+
+    def _on_dead_letters_reported(self, notification_ids: List[str]):
+        self._outbox.mark_dead_reported(notification_ids)
+        self._in_flight.difference_update(notification_ids)
+
+    async def _report_failed(self, notification_ids: List[str], reason: str, retry_after: Optional[float] = None) -> bool:
+        """
+        PATCH /notifications/telegram-failed: з `retry_after` бекенд не повертає сповіщення
+        стільки секунд, без нього - більше ніколи (dead letter). Повертає True у разі успіху.
+        """
+        if not self._failure_reports_supported:
+            return False
+        body = {"ids": notification_ids, "reason": reason}
+        if retry_after is not None:
+            body["retryAfter"] = retry_after
+        try:
+            async with self._get_session().patch(
+                f"{self.backend_url}/notifications/telegram-failed",
+                data=codec.dumps(body),
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                # Старий бекенд: маршрут не знайдено або запит потрапив під authenticate
+                if response.status in (401, 404, 405):
+                    logger.warning("Reporting failed notifications is not supported by the backend")
+                    self._failure_reports_supported = False
+                    return False
+                if response.status == 200:
+                    return True
+                logger.error(f"Reporting {len(notification_ids)} failed notifications failed with status {response.status}")
+        except Exception as e:
+            logger.error(f"Error reporting {len(notification_ids)} failed notifications: {e}")
+        return False
+
+    def _on_acknowledged(self, notification_ids: List[str]):
+        """Бекенд підтвердив доставку: сповіщення більше не в обробці"""
+        self._outbox.mark_acked(notification_ids)
+        self._in_flight.difference_update(notification_ids)
+
+    async def _acknowledge(self, notification_ids: List[str]) -> List[str]:
+        """
+        Відмічає пачку сповіщень як відправлені одним запитом.
+        Якщо бекенд не підтримує пакетне підтвердження, відмічає кожне окремо.
+        Повертає id, які вдалося підтвердити.
+        """
+        with STAGE_LATENCY.time(stage="ack"):
+            if self._bulk_ack_supported:
+                acknowledged = await self._mark_notifications_sent(notification_ids)
+                if acknowledged is not None:
+                    return acknowledged
+
+            semaphore = asyncio.Semaphore(ACK_FALLBACK_CONCURRENCY)
+
+            async def mark(notification_id: str) -> bool:
+                async with semaphore:
+                    return await self._mark_notification_sent(notification_id)
+
+            results = await asyncio.gather(*(mark(notification_id) for notification_id in notification_ids))
+            return [notification_id for notification_id, ok in zip(notification_ids, results) if ok]
+
+    async def _mark_notifications_sent(self, notification_ids: List[str]) -> Optional[List[str]]:
+        """
+        Відмічає кілька сповіщень як відправлені через PATCH /notifications/telegram-sent.
+        Повертає підтверджені id, [] у разі помилки або None, якщо бекенд не підтримує цей ендпоінт.
+        """
+        try:
+            async with self._get_session().patch(
+                f"{self.backend_url}/notifications/telegram-sent",
+                data=codec.dumps({"ids": notification_ids}),
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                # Старий бекенд: маршрут не знайдено або запит потрапив під authenticate
+                if response.status in (401, 404, 405):
+                    logger.warning("Bulk acknowledgement is not supported by the backend, falling back to per-id PATCH")
+                    self._bulk_ack_supported = False
+                    return None
+                if response.status == 200:
+                    logger.info(f"{len(notification_ids)} notifications marked as sent")
+                    return notification_ids
+                logger.error(f"Bulk acknowledgement failed with status {response.status}")
+        except Exception as e:
+            logger.error(f"Error marking {len(notification_ids)} notifications as sent: {e}")
+        return []
+
+    async def _mark_notification_sent(self, notification_id: str) -> bool:
         """Відмічає сповіщення як відправлене в Telegram"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.patch(
-                    f"{self.backend_url}/notifications/{notification_id}/telegram-sent",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    if response.status == 200:
-                        logger.info(f"Notification {notification_id} marked as sent")
+            async with self._get_session().patch(
+                f"{self.backend_url}/notifications/{notification_id}/telegram-sent"
+            ) as response:
+                if response.status == 200:
+                    logger.info(f"Notification {notification_id} marked as sent")
+                    return True
+                # Сповіщення вже видалене — повторювати немає сенсу
+                return response.status == 404
         except Exception as e:
             logger.error(f"Error marking notification {notification_id} as sent: {e}")
+        return False
@@ -0,0 +1,136 @@
+import os
+import logging
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import localization
+from localization import Localization
+
+logger = logging.getLogger(__name__)
+
+# Адреса сайту для посилань у сповіщеннях; за замовчуванням та сама, що й у WebApp
+NOTIFICATION_BASE_URL = os.getenv("NOTIFICATION_BASE_URL", os.getenv("WEBAPP_URL", "")).rstrip('/')
+# Мова сповіщень, якщо бекенд не передав мову користувача або вона не підтримується
+NOTIFICATION_DEFAULT_LANGUAGE = os.getenv("NOTIFICATION_DEFAULT_LANGUAGE", "uk")
+
+# Emoji для різних типів сповіщень
+NOTIFICATION_EMOJIS = {
+    'message': '💬',
+    'new_order': '🛒',
+    'status_change': '🔄',
+    'deadline': '⏰',
+    'payment': '💰',
+    'review': '⭐',
+    'dispute': '⚠️',
+}
+DEFAULT_EMOJI = '🔔'
+
+# Посилання за типом сповіщення: (ключ підпису, шлях; {related_id} підставляється при рендерингу)
+NOTIFICATION_LINKS = {
+    'message': ('notification_view_order', '/orders/{related_id}'),
+    'new_order': ('notification_view_order', '/orders/{related_id}'),
+    'status_change': ('notification_view_order', '/orders/{related_id}'),
+    'review': ('notification_view_profile', '/profile'),
+}
+
+
+class CompiledTemplate(NamedTuple):
+    """
+    Готові фрагменти сповіщення одного типу однією мовою.
+    Посилання складається як `link_prefix + related_id + link_suffix`;
+    якщо шлях не містить id, `link_suffix` дорівнює None і посилання — це `link_prefix`.
+    """
+
+    header: str
+    bullet: str
+    link_prefix: Optional[str]
+    link_suffix: Optional[str]
+
+
+class NotificationTemplates:
+    """
+    Шаблони сповіщень, скомпільовані один раз для кожного типу й мови з перекладів `Localization`.
+
+    Рендеринг зводиться до пошуку готового шаблону і склеювання з текстом сповіщення;
+    заголовки дайджестів і рядки "…та ще N" запам'ятовуються для кожної кількості.
+    """
+
+    def __init__(
+        self,
+        translator: Localization,
+        base_url: str = NOTIFICATION_BASE_URL,
+        default_language: str = NOTIFICATION_DEFAULT_LANGUAGE,
+    ):
+        self.translator = translator
+        self.base_url = base_url
+        self.languages = tuple(translator.translations) or (translator.default_lang,)
+        self.default_language = default_language if default_language in self.languages else translator.default_lang
+        self._templates: Dict[Tuple[str, Optional[str]], CompiledTemplate] = {
+            (language, notification_type): self._compile(notification_type, language)
+            for language in self.languages
+            for notification_type in (*NOTIFICATION_EMOJIS, None)
+        }
+        self._digest_headers: Dict[Tuple[str, int], str] = {}
+        self._digest_more: Dict[Tuple[str, int], str] = {}
+
+    def _compile(self, notification_type: Optional[str], language: str) -> CompiledTemplate:
+        emoji = NOTIFICATION_EMOJIS.get(notification_type, DEFAULT_EMOJI)
+        header = f"{emoji} <b>{self.translator.get_template('notification_header', language)}</b>\n\n"
+        link_prefix = link_suffix = None
+        link = NOTIFICATION_LINKS.get(notification_type)
+        # Без адреси сайту посилання не додаються: відносні посилання Telegram не відкриє
+        if link and self.base_url:
+            label_key, path = link
+            label = self.translator.get_template(label_key, language)
+            url_prefix, has_id, url_suffix = f"{self.base_url}{path}".partition('{related_id}')
+            if has_id:
+                link_prefix, link_suffix = f"<a href='{url_prefix}", f"{url_suffix}'>{label}</a>"
+            else:
+                link_prefix = f"<a href='{url_prefix}'>{label}</a>"
+        return CompiledTemplate(header, f"{emoji} ", link_prefix, link_suffix)
+
+    def language(self, lang_code: Optional[str]) -> str:
+        """Підтримувана мова для коду мови користувача"""
+        return lang_code if lang_code in self.languages else self.default_language
+
+    def template(self, notification_type: Optional[str], lang_code: Optional[str]) -> CompiledTemplate:
+        language = self.language(lang_code)
+        template = self._templates.get((language, notification_type))
+        return template if template is not None else self._templates[(language, None)]
+
+    def link(self, notification_type: Optional[str], related_id: Optional[str], lang_code: Optional[str]) -> Optional[str]:
+        """Посилання на пов'язаний об'єкт сповіщення, якщо воно є"""
+        if not related_id:
+            return None
+        template = self.template(notification_type, lang_code)
+        if template.link_prefix is None:
+            return None
+        if template.link_suffix is None:
+            return template.link_prefix
+        return template.link_prefix + str(related_id) + template.link_suffix
+
+    def render(
+        self, notification_type: Optional[str], content: str, related_id: Optional[str], lang_code: Optional[str]
+    ) -> str:
+        """Текст окремого сповіщення"""
+        message = self.template(notification_type, lang_code).header + content
+        link = self.link(notification_type, related_id, lang_code)
+        return f"{message}\n\n{link}" if link else message
+
+    def digest_header(self, count: int, lang_code: Optional[str]) -> str:
+        key = (self.language(lang_code), count)
+        header = self._digest_headers.get(key)
+        if header is None:
+            text = self.translator.get_template('notification_digest_header', key[0]).format(count=count)
+            header = self._digest_headers[key] = f"{DEFAULT_EMOJI} <b>{text}</b>"
+        return header
+
+    def digest_more(self, count: int, lang_code: Optional[str]) -> str:
+        key = (self.language(lang_code), count)
+        more = self._digest_more.get(key)
+        if more is None:
+            more = self._digest_more[key] = self.translator.get_template('notification_digest_more', key[0]).format(count=count)
+        return more
+
+
+# Шаблони, скомпільовані з перекладів бота
+notification_templates = NotificationTemplates(localization.translator)
@@ -1,29 +1,123 @@
+import html
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, NamedTuple, Optional
 from telegram import Bot
 from telegram.constants import ParseMode
-from telegram.error import TelegramError
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TelegramError, TimedOut
+
+from metrics import registry
+from notification_templates import NOTIFICATION_EMOJIS, DEFAULT_EMOJI, notification_templates
+from send_scheduler import send_scheduler
 
 logger = logging.getLogger(__name__)
 
-# Emoji для різних типів сповіщень
-NOTIFICATION_EMOJIS = {
-    'message': '💬',
-    'new_order': '🛒',
-    'status_change': '🔄',
-    'deadline': '⏰',
-    'payment': '💰',
-    'review': '⭐',
-    'dispute': '⚠️',
-}
+SEND_FAILURES = registry.counter(
+    "hiwwer_bot_notification_send_failures_total",
+    "Notification messages that could not be sent, by error class (Forbidden, BadRequest, TimedOut, ...) and reason.",
+    ["error", "reason"],
+)
+
+# Скільки останніх сповіщень однієї групи (замовлення + тип) показувати в дайджесті
+DIGEST_ITEMS_PER_GROUP = 3
+# Довжина тексту одного сповіщення в дайджесті
+DIGEST_CONTENT_LIMIT = 300
+# Ліміт Telegram на довжину повідомлення (в одиницях UTF-16); блоки дайджесту,
+# що не вміщаються, замінюються рядком "…та ще N"
+MESSAGE_LIMIT = 4096
+# Місце, яке лишається для рядка "…та ще N"
+DIGEST_MORE_RESERVE = 64
+
+
+class SendResult(NamedTuple):
+    """
+    Результат відправки. Поводиться як bool: істинний, якщо повідомлення відправлено.
+    Для невдалої відправки `reason` - причина, `permanent` - чи безнадійні повтори
+    (бот заблокований, чату не існує, Telegram відхиляє сам текст).
+    """
+
+    ok: bool
+    reason: Optional[str] = None
+    permanent: bool = False
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+SENT = SendResult(True)
+
+
+def classify_send_error(error: Exception) -> SendResult:
+    """Визначає причину невдалої відправки і чи має сенс її повторювати"""
+    # BadRequest і TimedOut - підкласи NetworkError, тому перевіряються раніше
+    if isinstance(error, Forbidden):
+        return SendResult(False, "forbidden", True)
+    if isinstance(error, ChatMigrated):
+        return SendResult(False, "chat_migrated", True)
+    if isinstance(error, BadRequest):
+        if "chat not found" in str(error).lower():
+            return SendResult(False, "chat_not_found", True)
+        return SendResult(False, "bad_request", True)
+    if isinstance(error, RetryAfter):
+        return SendResult(False, "flood_control")
+    if isinstance(error, TimedOut):
+        return SendResult(False, "timed_out")
+    if isinstance(error, NetworkError):
+        return SendResult(False, "network")
+    if isinstance(error, TelegramError):
+        return SendResult(False, "telegram_error")
+    return SendResult(False, "unexpected")
+
+
+def _length(text: str) -> int:
+    # Telegram рахує довжину в одиницях UTF-16: emoji займають дві
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _escape(content: Optional[str]) -> str:
+    # Текст сповіщення - звичайний текст, а повідомлення відправляються з розміткою HTML
+    return html.escape(content or '', quote=False)
+
+
+def _shorten(content: Optional[str]) -> str:
+    """Обрізає текст до DIGEST_CONTENT_LIMIT до екранування, щоб не розрізати HTML-сутність"""
+    content = content or ''
+    if len(content) > DIGEST_CONTENT_LIMIT:
+        content = content[:DIGEST_CONTENT_LIMIT - 1] + '…'
+    return _escape(content)
+
+
+async def _send(bot: Bot, chat_id: str, message: str, deadline: Optional[float] = None) -> SendResult:
+    """Відправляє готовий текст через планувальник"""
+    try:
+        # Відправка йде через планувальник: він дотримується лімітів Telegram і чекає після RetryAfter
+        await send_scheduler.send(chat_id, lambda: bot.send_message(
+            chat_id=chat_id,
+            text=message,
+            parse_mode=ParseMode.HTML,
+            disable_web_page_preview=True
+        ), deadline=deadline)
+        return SENT
+    except TelegramError as e:
+        result = classify_send_error(e)
+        SEND_FAILURES.inc(error=type(e).__name__, reason=result.reason)
+        logger.error(f"Failed to send Telegram notification to chat_id={chat_id}: {e}")
+        return result
+    except Exception as e:
+        result = classify_send_error(e)
+        SEND_FAILURES.inc(error=type(e).__name__, reason=result.reason)
+        logger.error(f"Unexpected error sending notification to chat_id={chat_id}: {e}")
+        return result
+
 
 async def send_telegram_notification(
     bot: Bot,
     chat_id: str,
     notification_type: str,
     content: str,
-    related_id: Optional[str] = None
-) -> bool:
+    related_id: Optional[str] = None,
+    deadline: Optional[float] = None,
+    lang_code: Optional[str] = None
+) -> SendResult:
     """
     Надсилає сповіщення користувачу в Telegram.
     
@@ -33,38 +127,87 @@ async def send_telegram_notification(
         notification_type: Тип сповіщення (message, new_order, status_change, etc.)
         content: Текст сповіщення
         related_id: ID пов'язаного об'єкта (замовлення, диспуту тощо)
+        deadline: Час (time.monotonic()), до якого бажано відправити; при перевантаженні
+            раніші дедлайни відправляються першими
+        lang_code: Мова користувача (languageCode з бекенду); без неї - NOTIFICATION_DEFAULT_LANGUAGE
         
     Returns:
-        True якщо сповіщення успішно відправлено, False якщо ні
+        SendResult: істинний, якщо сповіщення відправлено; інакше - з причиною невдачі
     """
-    try:
-        emoji = NOTIFICATION_EMOJIS.get(notification_type, '🔔')
-        
-        # Форматуємо повідомлення
-        message = f"{emoji} <b>Сповіщення</b>\n\n{content}"
-        
-        # Додаємо посилання якщо є related_id
-        if related_id and notification_type in ['message', 'new_order', 'status_change']:
-            message += f"\n\n<a href='https://your-domain.com/orders/{related_id}'>Переглянути замовлення</a>"
-        elif related_id and notification_type == 'review':
-            message += f"\n\n<a href='https://your-domain.com/profile'>Переглянути профіль</a>"
-        
-        await bot.send_message(
-            chat_id=chat_id,
-            text=message,
-            parse_mode=ParseMode.HTML,
-            disable_web_page_preview=True
-        )
-        
+    # Заголовок і посилання беруться з готових шаблонів типу та мови (notification_templates.py)
+    message = notification_templates.render(notification_type, _escape(content), related_id, lang_code)
+    
+    result = await _send(bot, chat_id, message, deadline)
+    if result:
         logger.info(f"Notification sent to chat_id={chat_id}, type={notification_type}")
-        return True
+    return result
+
+
+async def send_telegram_digest(
+    bot: Bot,
+    chat_id: str,
+    notifications: List[Dict[str, Any]],
+    deadline: Optional[float] = None
+) -> SendResult:
+    """
+    Надсилає кілька сповіщень одним повідомленням, згрупованими за замовленням і типом.
+    
+    Args:
+        bot: Екземпляр Telegram бота
+        chat_id: ID чату користувача в Telegram
+        notifications: Сповіщення в порядку надходження; мова береться з languageCode першого
+        deadline: Час (time.monotonic()), до якого бажано відправити
         
-    except TelegramError as e:
-        logger.error(f"Failed to send Telegram notification to chat_id={chat_id}: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"Unexpected error sending notification to chat_id={chat_id}: {e}")
-        return False
+    Returns:
+        SendResult: істинний, якщо дайджест відправлено; інакше - з причиною невдачі
+    """
+    lang_code = notifications[0].get('languageCode')
+    if len(notifications) == 1:
+        notification = notifications[0]
+        return await send_telegram_notification(
+            bot, chat_id, notification.get('type'), notification.get('content'), notification.get('relatedId'),
+            deadline=deadline, lang_code=lang_code
+        )
+
+    # {relatedId: {type: [content, ...]}} у порядку першої появи
+    groups: Dict[Optional[str], Dict[str, List[str]]] = {}
+    for notification in notifications:
+        by_type = groups.setdefault(notification.get('relatedId'), {})
+        by_type.setdefault(notification.get('type'), []).append(notification.get('content'))
+
+    blocks = [notification_templates.digest_header(len(notifications), lang_code)]
+    length = _length(blocks[0])
+    omitted = 0
+    for related_id, by_type in groups.items():
+        if omitted:
+            omitted += sum(len(contents) for contents in by_type.values())
+            continue
+        lines = []
+        link = None
+        for notification_type, contents in by_type.items():
+            bullet = notification_templates.template(notification_type, lang_code).bullet
+            hidden = len(contents) - DIGEST_ITEMS_PER_GROUP
+            if hidden > 0:
+                lines.append(bullet + notification_templates.digest_more(hidden, lang_code))
+            lines.extend(bullet + _shorten(content) for content in contents[-DIGEST_ITEMS_PER_GROUP:])
+            link = link or notification_templates.link(notification_type, related_id, lang_code)
+        if link:
+            lines.append(link)
+        block = "\n".join(lines)
+        # Решта груп не вміщається в одне повідомлення — лише рахуємо їх
+        block_length = _length(block)
+        if length + block_length + 2 + DIGEST_MORE_RESERVE > MESSAGE_LIMIT:
+            omitted = sum(len(contents) for contents in by_type.values())
+            continue
+        blocks.append(block)
+        length += block_length + 2
+    if omitted:
+        blocks.append(DEFAULT_EMOJI + " " + notification_templates.digest_more(omitted, lang_code))
+
+    result = await _send(bot, chat_id, "\n\n".join(blocks), deadline)
+    if result:
+        logger.info(f"Digest of {len(notifications)} notifications sent to chat_id={chat_id}")
+    return result
 
 
 async def format_notification_message(notification: Dict[str, Any]) -> str:
@@ -80,6 +223,6 @@ async def format_notification_message(notification: Dict[str, Any]) -> str:
     notification_type = notification.get('type', 'unknown')
     content = notification.get('content', 'Нове сповіщення')
     
-    emoji = NOTIFICATION_EMOJIS.get(notification_type, '🔔')
+    emoji = NOTIFICATION_EMOJIS.get(notification_type, DEFAULT_EMOJI)
     
     return f"{emoji} {content}"
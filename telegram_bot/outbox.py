@@ -0,0 +1,243 @@
+import time
+import sqlite3
+import asyncio
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import codec
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxEntry(NamedTuple):
+    """Стан сповіщення в журналі: кількість невдалих спроб, час наступної (time.time()) та остання помилка"""
+
+    state: str
+    attempts: int
+    retry_at: float
+    error: Optional[str]
+
+
+class NotificationOutbox:
+    """
+    Локальний журнал сповіщень у SQLite, що переживає перезапуски бота.
+
+    Кожне сповіщення проходить стани pending -> sending -> sent -> acked:
+      - pending: отримане з бекенду, ще не відправлене;
+      - sending: відправка почалася (записується до виклику Telegram);
+      - sent: доставлене в Telegram, але бекенд ще не підтвердив;
+      - acked: підтверджене на бекенді;
+      - dead: недоставне (бот заблокований, чату не існує, вичерпано спроби),
+        ще не повідомлене бекенду; dead_reported - повідомлене.
+    Після невдалої спроби сповіщення повертається в pending з часом наступної спроби (retry_at).
+    Записи acked, dead_reported і pending зберігаються `retention` секунд: acked — щоб відкидати
+    повтори, які бекенд міг віддати до підтвердження, pending — щоб після
+    перезапуску продовжити доставку без бекенду.
+
+    Повторно відправляється лише сповіщення в стані pending, тож кожне
+    сповіщення потрапляє до користувача не більше одного разу.
+
+    Фіксується одразу лише те, від чого залежить, чи відправляти сповіщення знову:
+    початок відправки, невдача і dead letter. Решта змін (отримання, доставка, підтвердження)
+    накопичується і фіксується однією транзакцією раз на COMMIT_EVERY змін або COMMIT_DELAY секунд;
+    якщо бот впаде раніше, сповіщення буде отримане або підтверджене ще раз.
+    """
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    ACKED = "acked"
+    DEAD = "dead"
+    DEAD_REPORTED = "dead_reported"
+
+    # Очищення старих записів сканує таблицю, тому виконується раз на N підтверджень
+    PRUNE_EVERY = 100
+    # Відкладені зміни фіксуються пачкою: за кількістю або за часом (секунди)
+    COMMIT_EVERY = 200
+    COMMIT_DELAY = 0.5
+
+    def __init__(self, path: str, retention: float = 86400.0):
+        self.retention = retention
+        self._acks = 0
+        self._uncommitted = 0
+        self._commit_timer: Optional[asyncio.TimerHandle] = None
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # У режимі WAL транзакція з NORMAL переживає падіння процесу, але не fsync-иться на кожному commit
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                   id TEXT PRIMARY KEY,
+                   payload BLOB NOT NULL,
+                   state TEXT NOT NULL,
+                   updated_at REAL NOT NULL,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   retry_at REAL NOT NULL DEFAULT 0,
+                   error TEXT
+               )"""
+        )
+        # Журнали, створені до появи повторів, доповнюємо новими колонками
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for column, definition in (
+            ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+            ("retry_at", "REAL NOT NULL DEFAULT 0"),
+            ("error", "TEXT"),
+        ):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {column} {definition}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_state ON outbox (state, updated_at)")
+        self._db.commit()
+
+    def record(self, notification: dict) -> OutboxEntry:
+        """
+        Зберігає отримане сповіщення і повертає його стан.
+        Будь-який стан, окрім pending, означає повтор, який не треба відправляти;
+        pending з retry_at у майбутньому ще не час відправляти.
+        """
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO outbox (id, payload, state, updated_at) VALUES (?, ?, ?, ?)",
+            (notification.get("id"), codec.dumps(notification), self.PENDING, time.time()),
+        )
+        if cursor.rowcount:
+            self._commit_later()
+        row = self._db.execute(
+            "SELECT state, attempts, retry_at, error FROM outbox WHERE id = ?", (notification.get("id"),)
+        ).fetchone()
+        return OutboxEntry(*row)
+
+    def mark_sending(self, notification_ids: Iterable[str]) -> None:
+        """Фіксується до виклику Telegram, разом з усіма відкладеними змінами"""
+        self._set_state(notification_ids, self.SENDING)
+        self.commit()
+
+    def mark_sent(self, notification_ids: Iterable[str]) -> None:
+        self._set_state(notification_ids, self.SENT)
+        self._commit_later()
+
+    def mark_failed(self, notification_ids: Iterable[str], error: Optional[str] = None) -> Dict[str, int]:
+        """
+        Відправка не вдалася — сповіщення можна буде відправити знову.
+        Повертає кількість невдалих спроб кожного сповіщення разом із цією.
+        """
+        notification_ids = list(notification_ids)
+        self._db.executemany(
+            "UPDATE outbox SET state = ?, updated_at = ?, attempts = attempts + 1, error = ? WHERE id = ?",
+            [(self.PENDING, time.time(), error, notification_id) for notification_id in notification_ids],
+        )
+        self.commit()
+        return self._attempts(notification_ids)
+
+    def defer(self, notification_ids: Iterable[str], retry_at: float) -> None:
+        """Наступна спроба відправки не раніше `retry_at` (time.time())"""
+        self._db.executemany(
+            "UPDATE outbox SET retry_at = ? WHERE id = ?",
+            [(retry_at, notification_id) for notification_id in notification_ids],
+        )
+        self.commit()
+
+    def mark_dead(self, notification_ids: Iterable[str], error: str) -> None:
+        """Сповіщення недоставне: більше не відправляється і чекає, доки про нього дізнається бекенд"""
+        self._db.executemany(
+            "UPDATE outbox SET state = ?, updated_at = ?, error = ? WHERE id = ?",
+            [(self.DEAD, time.time(), error, notification_id) for notification_id in notification_ids],
+        )
+        self.commit()
+
+    def mark_dead_reported(self, notification_ids: Iterable[str]) -> None:
+        self._set_state(notification_ids, self.DEAD_REPORTED)
+        self._commit_later()
+
+    def mark_acked(self, notification_ids: Iterable[str]) -> None:
+        notification_ids = list(notification_ids)
+        self._set_state(notification_ids, self.ACKED)
+        self._commit_later(len(notification_ids))
+        self._acks += len(notification_ids)
+        if self._acks >= self.PRUNE_EVERY:
+            self._acks = 0
+            self._prune()
+
+    def pending(self) -> List[dict]:
+        """Сповіщення, отримані, але ще не відправлені, у порядку отримання"""
+        self._prune()
+        rows = self._db.execute(
+            "SELECT payload FROM outbox WHERE state = ? ORDER BY rowid", (self.PENDING,)
+        ).fetchall()
+        return [codec.loads(row[0]) for row in rows]
+
+    def unacknowledged(self) -> List[str]:
+        """
+        id сповіщень, доставлених, але не підтверджених на бекенді (наприклад, до падіння бота).
+        Сповіщення, відправка яких обірвалася посередині, теж вважаються доставленими:
+        краще не надіслати повідомлення вдруге, ніж продублювати його.
+        """
+        rows = self._db.execute(
+            "SELECT id, state FROM outbox WHERE state IN (?, ?)", (self.SENDING, self.SENT)
+        ).fetchall()
+        interrupted = [row[0] for row in rows if row[1] == self.SENDING]
+        if interrupted:
+            logger.warning(f"{len(interrupted)} notifications were being sent when the bot stopped, treating them as sent")
+            self.mark_sent(interrupted)
+        return [row[0] for row in rows]
+
+    def dead_letters(self) -> List[str]:
+        """id недоставних сповіщень, про які бекенд ще не знає"""
+        rows = self._db.execute("SELECT id FROM outbox WHERE state = ?", (self.DEAD,)).fetchall()
+        return [row[0] for row in rows]
+
+    def errors(self, notification_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Остання помилка відправки кожного сповіщення"""
+        return dict(self._select(list(notification_ids), "error"))
+
+    def commit(self) -> None:
+        """Фіксує всі відкладені зміни"""
+        if self._commit_timer is not None:
+            self._commit_timer.cancel()
+            self._commit_timer = None
+        self._uncommitted = 0
+        self._db.commit()
+
+    def close(self) -> None:
+        self.commit()
+        self._db.close()
+
+    def _commit_later(self, changes: int = 1) -> None:
+        """Відкладає фіксацію змін, доки їх не набереться COMMIT_EVERY або не мине COMMIT_DELAY"""
+        self._uncommitted += changes
+        if self._uncommitted >= self.COMMIT_EVERY:
+            self.commit()
+        elif self._commit_timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # Поза event loop таймера немає — фіксуємо одразу
+                self.commit()
+                return
+            self._commit_timer = loop.call_later(self.COMMIT_DELAY, self.commit)
+
+    def _prune(self) -> None:
+        self._db.execute(
+            "DELETE FROM outbox WHERE state IN (?, ?, ?) AND updated_at < ?",
+            (self.ACKED, self.DEAD_REPORTED, self.PENDING, time.time() - self.retention),
+        )
+        self.commit()
+
+    def _set_state(self, notification_ids: Iterable[str], state: str) -> None:
+        now = time.time()
+        self._db.executemany(
+            "UPDATE outbox SET state = ?, updated_at = ? WHERE id = ?",
+            [(state, now, notification_id) for notification_id in notification_ids],
+        )
+
+    def _attempts(self, notification_ids: List[str]) -> Dict[str, int]:
+        return dict(self._select(notification_ids, "attempts"))
+
+    def _select(self, notification_ids: List[str], column: str) -> List[Tuple[str, object]]:
+        rows: List[Tuple[str, object]] = []
+        # SQLite обмежує кількість параметрів запиту, тому читаємо частинами
+        for start in range(0, len(notification_ids), 500):
+            chunk = notification_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(self._db.execute(
+                f"SELECT id, {column} FROM outbox WHERE id IN ({placeholders})", chunk
+            ).fetchall())
+        return rows
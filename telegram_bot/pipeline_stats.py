@@ -0,0 +1,78 @@
+import time
+import logging
+from typing import Callable, Dict, List
+
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineSummary:
+    """
+    Підсумок роботи конвеєра сповіщень за інтервал між викликами `report()`:
+    скільки сповіщень доставлено і з якою швидкістю, скільки відправок не вдалося
+    (за класом помилки Telegram), медіана та p95 затримки від створення на бекенді
+    до доставки і поточний розмір черг.
+
+    Рахується з тих самих метрик, що віддаються в Prometheus, тож лог і метрики не розходяться.
+    """
+
+    def __init__(
+        self,
+        sent: Counter,
+        failures: Counter,
+        lag: Histogram,
+        backlog: Callable[[], Dict[str, int]],
+    ):
+        self.sent = sent
+        self.failures = failures
+        self.lag = lag
+        self.backlog = backlog
+        self._reported = time.monotonic()
+        self._sent = self._total_sent()
+        self._failures = self._failures_by_error()
+        self._lag = lag.snapshot()
+
+    def _total_sent(self) -> float:
+        return sum(value for _, value in self.sent.items())
+
+    def _failures_by_error(self) -> Dict[str, float]:
+        by_error: Dict[str, float] = {}
+        for labels, value in self.failures.items():
+            error = labels.get("error", "")
+            by_error[error] = by_error.get(error, 0.0) + value
+        return by_error
+
+    def _bound(self, quantile: float) -> str:
+        # Квантиль відомий лише з точністю до бакета гістограми
+        if quantile == float("inf"):
+            return f">{self.lag.buckets[-1]:g}s"
+        return f"<={quantile:g}s"
+
+    def report(self) -> str:
+        """Пише в лог підсумок з моменту попереднього виклику і повертає його"""
+        now = time.monotonic()
+        elapsed = max(now - self._reported, 1e-9)
+        sent, failures, lag = self._total_sent(), self._failures_by_error(), self.lag.snapshot()
+
+        sent_delta = sent - self._sent
+        failed = {
+            error: value - self._failures.get(error, 0.0)
+            for error, value in failures.items()
+            if value > self._failures.get(error, 0.0)
+        }
+        lag_delta = [count - previous for count, previous in zip(lag, self._lag)]
+        self._reported, self._sent, self._failures, self._lag = now, sent, failures, lag
+
+        parts: List[str] = [f"{sent_delta:.0f} sent ({sent_delta / elapsed:.1f}/s)"]
+        if failed:
+            reasons = ", ".join(f"{error}: {count:.0f}" for error, count in sorted(failed.items(), key=lambda item: -item[1]))
+            parts.append(f"{sum(failed.values()):.0f} send failures ({reasons})")
+        p50, p95 = self.lag.quantile(0.5, lag_delta), self.lag.quantile(0.95, lag_delta)
+        if p50 is not None:
+            parts.append(f"lag p50 {self._bound(p50)} p95 {self._bound(p95)}")
+        parts.append("backlog " + ", ".join(f"{stage} {size}" for stage, size in self.backlog().items()))
+
+        line = "Notification pipeline: " + ", ".join(parts)
+        logger.info(line)
+        return line
@@ -0,0 +1,135 @@
+import re
+import time
+import random
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Path segments that identify a single resource (UUIDs, numeric ids)
+_ID_SEGMENT = re.compile(r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|\d+)(?=/|$)")
+
+
+def endpoint_name(endpoint: str) -> str:
+    """Collapse resource ids in an endpoint path, e.g. `/orders/42/messages` -> `/orders/{id}/messages`."""
+    return _ID_SEGMENT.sub("/{id}", endpoint.split("?", 1)[0])
+
+
+def backoff_delay(attempt: int, base: float = 0.2, cap: float = 5.0) -> float:
+    """Exponential backoff with full jitter for the given (zero-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    A closed / open / half-open circuit breaker.
+
+    The breaker opens after `failure_threshold` consecutive failures and rejects
+    calls for `reset_timeout` seconds. It then lets up to `half_open_max_calls`
+    probe calls through: a success closes it again, a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go through right now."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._enter_half_open()
+
+        if self.state == self.HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                # A probe that never reported back must not wedge the breaker
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._enter_half_open()
+            self._half_open_calls += 1
+
+        return True
+
+    def _enter_half_open(self) -> None:
+        self.state = self.HALF_OPEN
+        self._half_open_calls = 0
+        self._opened_at = time.monotonic()
+        logger.info(f"Circuit breaker '{self.name}' is half-open")
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit breaker '{self.name}' closed")
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit breaker '{self.name}' opened after {self._failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    A global budget that caps retries to a fraction of regular requests.
+
+    Every request deposits `ratio` tokens and every retry withdraws one, so
+    retries can add at most `ratio` extra load on top of the original traffic.
+    `max_tokens` bounds the reserve that can build up while the backend is healthy.
+    """
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self.retries = 0
+        self.rejected = 0
+
+    def deposit(self) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Take a token for one retry; returns False when the budget is exhausted."""
+        if self._tokens < 1:
+            self.rejected += 1
+            return False
+        self._tokens -= 1
+        self.retries += 1
+        return True
+
+
+class LatencyWindow:
+    """Keeps the most recent latency samples of an endpoint to estimate its percentiles."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float:
+        """Return the `q`-th percentile (0-100) of the recorded samples, or 0.0 if there are none."""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * q / 100))
+        return ordered[index]
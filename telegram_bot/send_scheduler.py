@@ -0,0 +1,206 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict, deque
+from datetime import timedelta
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar, Union
+
+from telegram.error import RetryAfter
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Ліміти Telegram: ~30 повідомлень/с на бота і ~1 повідомлення/с в один чат
+SEND_GLOBAL_RATE = float(os.getenv("TELEGRAM_SEND_RATE", "30"))
+SEND_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_SEND_RATE", "1"))
+# Скільки повідомлень поспіль можна відправити в чат, перш ніж почне діяти SEND_CHAT_RATE
+SEND_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_SEND_BURST", "3"))
+# Скільки разів повторювати відправку після RetryAfter, перш ніж здатися
+SEND_MAX_RETRIES = int(os.getenv("TELEGRAM_SEND_MAX_RETRIES", "5"))
+# Кількість чатів, для яких зберігається стан лімітів
+SEND_MAX_CHATS = 10000
+# Якщо RetryAfter отримали стільки різних чатів за FLOOD_WINDOW секунд,
+# обмеження вважається глобальним і пауза ставиться на всього бота
+GLOBAL_FLOOD_CHATS = 3
+FLOOD_WINDOW = 1.0
+
+SEND_WAIT = registry.histogram(
+    "hiwwer_bot_send_scheduler_wait_seconds", "Time a send waited for rate-limit tokens or a flood-control pause."
+)
+RETRY_AFTER = registry.counter(
+    "hiwwer_bot_send_retry_after_total", "RetryAfter responses by the scope that was paused (chat or global).", ["scope"]
+)
+
+T = TypeVar("T")
+ChatId = Union[int, str]
+
+
+class TokenBucket:
+    """
+    Token bucket: `rate` токенів за секунду, не більше `capacity` накопичених.
+
+    Очікувачі обслуговуються за найранішим дедлайном; без дедлайну ним є момент
+    виклику, тож звичайні виклики отримують токени в порядку черги.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._waiters: List[tuple] = []
+        self._sequence = itertools.count()
+        self._serving: Optional[asyncio.Task] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity and not self._waiters
+
+    def touch(self) -> None:
+        """Рахує поповнення від поточного моменту, відкидаючи токени, що накопичилися, поки власник чекав деінде"""
+        self._updated = time.monotonic()
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        key = deadline if deadline is not None else time.monotonic()
+        heapq.heappush(self._waiters, (key, next(self._sequence), future))
+        if self._serving is None or self._serving.done():
+            self._serving = asyncio.create_task(self._serve())
+        await future
+
+    async def _serve(self) -> None:
+        while self._waiters:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            # Скасований очікувач токен не забирає
+            if not future.done():
+                self._tokens -= 1
+                future.set_result(None)
+
+
+class SendScheduler:
+    """
+    Центральний планувальник вихідних повідомлень бота.
+
+    Кожна відправка чекає токен у бакеті свого чату та в глобальному бакеті.
+    Після RetryAfter на паузу ставиться лише відповідний чат (або весь бот,
+    якщо обмеження отримали кілька чатів одночасно), а відправка чекає й повторюється
+    замість того, щоб завершитися помилкою.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = SEND_GLOBAL_RATE,
+        chat_rate: float = SEND_CHAT_RATE,
+        chat_burst: float = SEND_CHAT_BURST,
+        max_retries: int = SEND_MAX_RETRIES,
+        max_chats: int = SEND_MAX_CHATS,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        # Глобальний бакет без запасу: відправки рівномірно розподілені в межах секунди
+        self._global = TokenBucket(global_rate, 1)
+        self._chats: "OrderedDict[ChatId, TokenBucket]" = OrderedDict()
+        self._chat_paused_until: Dict[ChatId, float] = {}
+        self._global_paused_until = 0.0
+        self._recent_floods: Deque[tuple] = deque()
+
+    async def send(self, chat_id: ChatId, send: Callable[[], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """
+        Виконує `send()` (виклик Bot API для чату `chat_id`) з урахуванням лімітів.
+        Коли бот упирається в глобальний ліміт, першими йдуть відправки з ранішим
+        `deadline` (time.monotonic()); без нього — в порядку черги.
+        Повертає результат `send()`; RetryAfter пробрасується лише після max_retries повторів.
+        """
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            await self._wait_for_pause(chat_id)
+            chat_bucket = self._chat_bucket(chat_id)
+            await chat_bucket.acquire()
+            await self._global.acquire(deadline)
+            # Інтервал для чату рахуємо від фактичної відправки, а не від моменту отримання токена
+            chat_bucket.touch()
+            # Пауза могла початися, поки ми чекали токени
+            await self._wait_for_pause(chat_id)
+            SEND_WAIT.observe(time.monotonic() - started)
+            try:
+                return await send()
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self._pause(chat_id, _seconds(e.retry_after))
+        raise AssertionError("unreachable")
+
+    def paused_for(self, chat_id: ChatId) -> float:
+        """Скільки секунд ще триває пауза для чату (з урахуванням глобальної)"""
+        until = max(self._global_paused_until, self._chat_paused_until.get(chat_id, 0.0))
+        return max(0.0, until - time.monotonic())
+
+    async def _wait_for_pause(self, chat_id: ChatId) -> None:
+        delay = self.paused_for(chat_id)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.paused_for(chat_id)
+
+    def _pause(self, chat_id: ChatId, seconds: float) -> None:
+        now = time.monotonic()
+        until = now + seconds
+        self._recent_floods.append((now, chat_id))
+        while self._recent_floods and self._recent_floods[0][0] < now - FLOOD_WINDOW:
+            self._recent_floods.popleft()
+
+        if len({flooded_chat for _, flooded_chat in self._recent_floods}) >= GLOBAL_FLOOD_CHATS:
+            self._global_paused_until = max(self._global_paused_until, until)
+            RETRY_AFTER.inc(scope="global")
+            logger.warning(f"Flood control hit in several chats, pausing all sends for {seconds:g}s")
+        else:
+            self._chat_paused_until[chat_id] = max(self._chat_paused_until.get(chat_id, 0.0), until)
+            RETRY_AFTER.inc(scope="chat")
+            logger.warning(f"Flood control hit for chat_id={chat_id}, pausing it for {seconds:g}s")
+
+    def _chat_bucket(self, chat_id: ChatId) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            self._evict_idle_chats()
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _evict_idle_chats(self) -> None:
+        # Видаляємо найдавніші чати, у яких бакет повний і немає паузи — їхній стан нічого не важить
+        now = time.monotonic()
+        for chat_id in list(self._chats):
+            if len(self._chats) <= self.max_chats:
+                break
+            if self._chats[chat_id].idle and self._chat_paused_until.get(chat_id, 0.0) <= now:
+                del self._chats[chat_id]
+                self._chat_paused_until.pop(chat_id, None)
+
+
+def _seconds(retry_after: Union[int, float, timedelta]) -> float:
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+# Єдиний планувальник для всіх повідомлень, які бот надсилає з власної ініціативи
+send_scheduler = SendScheduler()
@@ -0,0 +1,39 @@
+from typing import AsyncIterator, NamedTuple, Optional
+
+import aiohttp
+
+
+class ServerSentEvent(NamedTuple):
+    """A single event of a text/event-stream response."""
+
+    event: str
+    data: str
+    id: Optional[str]
+
+
+async def iter_events(response: aiohttp.ClientResponse) -> AsyncIterator[ServerSentEvent]:
+    """
+    Parse a text/event-stream response into events as lines arrive.
+
+    Comment lines (heartbeats) are skipped; an event without an `event:` field
+    is reported as "message", as in the EventSource spec.
+    """
+    event, event_id, data = "", None, []
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield ServerSentEvent(event or "message", "\n".join(data), event_id)
+            event, event_id, data = "", None, []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+        elif field == "id":
+            event_id = value
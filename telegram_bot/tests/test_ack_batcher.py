@@ -0,0 +1,75 @@
+"""
+Tests of batched acknowledgements while the backend fails.
+
+Run from the telegram_bot directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+import unittest
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ack_batcher import AckBatcher
+
+
+class FlakyBackend:
+    """Fails every acknowledgement until `healthy` is set."""
+
+    def __init__(self):
+        self.healthy = False
+        self.calls = 0
+        self.acked: List[str] = []
+
+    async def acknowledge(self, notification_ids: List[str]) -> List[str]:
+        self.calls += 1
+        if not self.healthy:
+            raise ConnectionError("backend is down")
+        self.acked.extend(notification_ids)
+        return notification_ids
+
+
+class AckBatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.backend = FlakyBackend()
+        self.batcher = AckBatcher(self.backend.acknowledge, max_batch=50, max_delay=0.05, max_retry_delay=0.2)
+        self.batcher.start()
+
+    async def asyncTearDown(self):
+        await self.batcher.stop()
+
+    async def test_backs_off_while_the_backend_fails(self):
+        # More than a full batch is pending, so without a pause the loop would retry right away
+        for number in range(60):
+            self.batcher.add(f"n{number}")
+        await asyncio.sleep(1.0)
+
+        # At most one attempt per max_delay, fewer as the pause grows
+        self.assertGreater(self.backend.calls, 1)
+        self.assertLessEqual(self.backend.calls, 1.0 / 0.05)
+        self.assertEqual(len(self.batcher), 60)
+
+    async def test_acknowledges_everything_once_the_backend_recovers(self):
+        for number in range(60):
+            self.batcher.add(f"n{number}")
+        await asyncio.sleep(0.3)
+        self.backend.healthy = True
+        await asyncio.sleep(0.5)
+
+        self.assertEqual(sorted(self.backend.acked), sorted(f"n{number}" for number in range(60)))
+        self.assertEqual(len(self.batcher), 0)
+
+    async def test_stop_does_not_wait_for_the_pause(self):
+        self.batcher.max_retry_delay = 30.0
+        self.batcher._failures = 10
+        for number in range(60):
+            self.batcher.add(f"n{number}")
+        await asyncio.sleep(0.2)
+
+        await asyncio.wait_for(self.batcher.stop(), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
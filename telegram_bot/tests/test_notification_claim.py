@@ -0,0 +1,258 @@
+"""
+Tests of notification claiming by several bot replicas against a local aiohttp stand-in backend.
+
+Run from the telegram_bot directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import unittest
+from collections import Counter
+from typing import Dict, List, Optional
+from unittest import mock
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Notifications are sent one by one, right away and without Telegram's send limits
+os.environ.setdefault("NOTIFICATION_DIGEST_WINDOW", "0")
+os.environ.setdefault("NOTIFICATION_STATS_INTERVAL", "0")
+os.environ.setdefault("NOTIFICATION_POLL_MAX_INTERVAL", "0.5")
+os.environ.setdefault("NOTIFICATION_ACK_BATCH_DELAY", "0.1")
+os.environ.setdefault("TELEGRAM_SEND_RATE", "1000000")
+os.environ.setdefault("TELEGRAM_CHAT_SEND_RATE", "1000000")
+
+import notification_service
+from notification_service import NotificationService
+from test_notification_stream import FakeBot, _eventually, _notification
+
+# Claiming again well within the lease keeps it alive; the real backend accepts leases from 1 s
+LEASE = 1.0
+# The stand-in holds an empty claim this long instead of the requested long-poll wait
+HOLD = 0.05
+
+
+class Lease:
+    def __init__(self, owner: str, until: float):
+        self.owner = owner
+        self.until = until
+
+
+class StandInClaimBackend:
+    """
+    Serves /telegram-claim with the same lease rules as the backend: free, expired
+    and the caller's own leases are claimable, and claiming renews the caller's leases.
+    """
+
+    def __init__(self, claiming: bool = True):
+        self.claiming = claiming
+        self.pending: List[dict] = []
+        self.acked: List[str] = []
+        self.leases: Dict[str, Lease] = {}
+        # Owners each notification was handed to, in order
+        self.claims: Dict[str, List[str]] = {}
+        # When each notification was first handed out (time.monotonic())
+        self.claimed_at: Dict[str, float] = {}
+        self.claim_requests = 0
+        self.pending_requests = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    def _claim_rows(self, owner: str, limit: int, lease: float) -> List[dict]:
+        now = time.monotonic()
+        rows = []
+        for notification in self.pending:
+            if len(rows) >= limit:
+                break
+            current = self.leases.get(notification["id"])
+            if current is None or current.until < now or current.owner == owner:
+                self.leases[notification["id"]] = Lease(owner, now + lease)
+                self.claims.setdefault(notification["id"], []).append(owner)
+                self.claimed_at.setdefault(notification["id"], now)
+                rows.append(notification)
+        return rows
+
+    async def _claim(self, request: web.Request) -> web.Response:
+        self.claim_requests += 1
+        if not self.claiming:
+            return web.json_response({"message": "Not found"}, status=404)
+        body = await request.json()
+        owner, limit, lease = body["owner"], int(body["limit"]), float(body["leaseSeconds"])
+        rows = self._claim_rows(owner, limit, lease)
+        headers = {}
+        if body.get("wait"):
+            headers["X-Long-Poll-Wait"] = str(body["wait"])
+            if not rows:
+                await asyncio.sleep(HOLD)
+                rows = self._claim_rows(owner, limit, lease)
+        return web.json_response(rows, headers=headers)
+
+    async def _pending(self, request: web.Request) -> web.Response:
+        self.pending_requests += 1
+        headers = {"X-Pending-Count": str(len(self.pending))} if request.query.get("count") == "1" else {}
+        return web.json_response(list(self.pending), headers=headers)
+
+    async def _ack(self, request: web.Request) -> web.Response:
+        ids = (await request.json())["ids"]
+        self.acked.extend(ids)
+        self.pending = [notification for notification in self.pending if notification["id"] not in ids]
+        for notification_id in ids:
+            self.leases.pop(notification_id, None)
+        return web.json_response({"ids": ids})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/v1/notifications/telegram-claim", self._claim)
+        app.router.add_get("/v1/notifications/pending-telegram", self._pending)
+        app.router.add_patch("/v1/notifications/telegram-sent", self._ack)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/v1"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+class BlockingBot(FakeBot):
+    """Hangs on sending the notification `blocked` until `release` is set."""
+
+    def __init__(self, blocked: str):
+        super().__init__()
+        self.blocked = blocked
+        self.sending = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def send_message(self, chat_id: str, text: str, **kwargs) -> None:
+        if f"[{self.blocked}]" in text:
+            self.sending.set()
+            await self.release.wait()
+        await super().send_message(chat_id, text, **kwargs)
+
+
+class NotificationClaimTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.backend = StandInClaimBackend()
+        await self.backend.start()
+        self.services: List[NotificationService] = []
+        patches = [
+            mock.patch.object(notification_service, "NOTIFICATION_CLAIM", True),
+            mock.patch.object(notification_service, "CLAIM_LEASE", LEASE),
+            mock.patch.object(notification_service, "CLAIM_BATCH", 5),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def asyncTearDown(self):
+        for service in self.services:
+            if isinstance(service.bot, BlockingBot):
+                service.bot.release.set()
+            await service.stop()
+        await self.backend.stop()
+
+    def _replica(self, name: str, bot: Optional[FakeBot] = None, outbox_path: str = ":memory:") -> NotificationService:
+        service = NotificationService(bot or FakeBot(), self.backend.url, workers=2, outbox_path=outbox_path)
+        # Replicas in one process would otherwise share the hostname-pid id
+        service.replica_id = name
+        self.services.append(service)
+        return service
+
+    def _sent(self) -> Counter:
+        total = Counter()
+        for service in self.services:
+            total.update(service.bot.sent)
+        return total
+
+    async def test_two_replicas_send_each_notification_once(self):
+        notifications = [_notification(number) for number in range(1, 101)]
+        self.backend.pending = list(notifications)
+        first, second = self._replica("replica-a"), self._replica("replica-b")
+        await asyncio.gather(first.start(), second.start())
+
+        await _eventually(lambda: len(self.backend.acked) == len(notifications))
+        self.assertEqual(self._sent(), Counter(notification["id"] for notification in notifications))
+        self.assertEqual(Counter(self.backend.acked), Counter(notification["id"] for notification in notifications))
+        # Every notification went to exactly one replica
+        for notification in notifications:
+            self.assertEqual(len(set(self.backend.claims[notification["id"]])), 1)
+        self.assertTrue(first.bot.sent and second.bot.sent)
+
+    async def test_replica_renews_its_own_leases(self):
+        slow = _notification(1)
+        self.backend.pending = [slow]
+        bot = BlockingBot(slow["id"])
+        first = self._replica("replica-a", bot)
+        await first.start()
+        await asyncio.wait_for(bot.sending.wait(), 5)
+
+        second = self._replica("replica-b")
+        await second.start()
+        self.backend.pending.append(_notification(2))
+        # The send hangs for several leases; replica-a keeps renewing, so replica-b never gets it
+        await asyncio.sleep(LEASE * 2.5)
+        self.assertEqual(set(self.backend.claims[slow["id"]]), {"replica-a"})
+        self.assertGreater(len(self.backend.claims[slow["id"]]), 3)
+
+        bot.release.set()
+        await _eventually(lambda: len(self.backend.acked) == 2)
+        self.assertEqual(self._sent(), Counter({"n0001": 1, "n0002": 1}))
+
+    async def test_picks_up_notifications_after_an_expired_lease(self):
+        notifications = [_notification(number) for number in range(1, 4)]
+        self.backend.pending = list(notifications)
+        expires = time.monotonic() + 0.5
+        for notification in notifications:
+            # Leased by a replica that crashed before sending
+            self.backend.leases[notification["id"]] = Lease("crashed-replica", expires)
+        service = self._replica("replica-a")
+        await service.start()
+
+        await _eventually(lambda: len(self.backend.acked) == len(notifications))
+        self.assertEqual(self._sent(), Counter(notification["id"] for notification in notifications))
+        for notification in notifications:
+            self.assertEqual(set(self.backend.claims[notification["id"]]), {"replica-a"})
+            self.assertGreaterEqual(self.backend.claimed_at[notification["id"]], expires)
+
+    async def test_falls_back_to_polling_without_the_claim_route(self):
+        self.backend.claiming = False
+        self.backend.pending = [_notification(1), _notification(2)]
+        service = self._replica("replica-a")
+        await service.start()
+
+        await _eventually(lambda: len(self.backend.acked) == 2)
+        self.assertFalse(service._claiming)
+        self.assertEqual(self.backend.claim_requests, 1)
+        self.assertGreater(self.backend.pending_requests, 0)
+        self.assertEqual(self._sent(), Counter({"n0001": 1, "n0002": 1}))
+
+    async def test_send_interrupted_by_shutdown_is_not_repeated(self):
+        self.backend.pending = [_notification(1)]
+        bot = BlockingBot("n0001")
+        with tempfile.TemporaryDirectory() as directory:
+            outbox_path = os.path.join(directory, "outbox.sqlite3")
+            first = self._replica("replica-a", bot, outbox_path)
+            await first.start()
+            await asyncio.wait_for(bot.sending.wait(), 5)
+            # Telegram may already have delivered the message, so the stop acknowledges it instead of retrying
+            await first.stop()
+            self.services.remove(first)
+            self.assertEqual(self.backend.acked, ["n0001"])
+
+            # Even if the backend still returns it, the restarted replica does not send it again
+            self.backend.pending = [_notification(1)]
+            restarted = self._replica("replica-a", outbox_path=outbox_path)
+            await restarted.start()
+            await _eventually(lambda: len(self.backend.acked) == 2)
+            self.assertEqual(self._sent(), Counter())
+            await restarted.stop()
+            self.services.remove(restarted)
+
+
+if __name__ == "__main__":
+    unittest.main()
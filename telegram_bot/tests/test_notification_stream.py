@@ -0,0 +1,211 @@
+"""
+Tests of the Server-Sent Events notification stream against a local aiohttp stand-in backend.
+
+Run from the telegram_bot directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import json
+import asyncio
+import unittest
+from collections import Counter
+from typing import Callable, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Notifications are sent one by one, right away and without Telegram's send limits
+os.environ.setdefault("NOTIFICATION_DIGEST_WINDOW", "0")
+os.environ.setdefault("NOTIFICATION_STATS_INTERVAL", "0")
+os.environ.setdefault("NOTIFICATION_POLL_MAX_INTERVAL", "0.5")
+os.environ.setdefault("NOTIFICATION_ACK_BATCH_DELAY", "0.1")
+os.environ.setdefault("TELEGRAM_SEND_RATE", "1000000")
+os.environ.setdefault("TELEGRAM_CHAT_SEND_RATE", "1000000")
+
+import sse
+from notification_service import NotificationService
+
+
+def _notification(number: int) -> dict:
+    return {"id": f"n{number:04d}", "userId": f"u{number % 3}", "chatId": f"chat-{number % 3}",
+            "type": "status_change", "content": f"[n{number:04d}]"}
+
+
+async def _eventually(predicate: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.02)
+
+
+class StandInBackend:
+    """Serves the notification endpoints with an event stream whose behaviour each test sets up."""
+
+    def __init__(self):
+        self.pending: List[dict] = []
+        self.acked: List[str] = []
+        self.stream_requests: List[Optional[str]] = []
+        # Called with (request, Last-Event-ID); returns the response for /telegram-stream
+        self.stream_handler = self._reject
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def _reject(self, request: web.Request, last_event_id: Optional[str]) -> web.StreamResponse:
+        return web.json_response({"message": "Not found"}, status=404)
+
+    async def _stream(self, request: web.Request) -> web.StreamResponse:
+        last_event_id = request.headers.get("Last-Event-ID")
+        self.stream_requests.append(last_event_id)
+        return await self.stream_handler(request, last_event_id)
+
+    async def _pending(self, request: web.Request) -> web.Response:
+        headers = {"X-Pending-Count": str(len(self.pending))} if request.query.get("count") == "1" else {}
+        return web.json_response(list(self.pending), headers=headers)
+
+    async def _ack(self, request: web.Request) -> web.Response:
+        ids = (await request.json())["ids"]
+        self.acked.extend(ids)
+        self.pending = [notification for notification in self.pending if notification["id"] not in ids]
+        return web.json_response({"ids": ids})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/v1/notifications/telegram-stream", self._stream)
+        app.router.add_get("/v1/notifications/pending-telegram", self._pending)
+        app.router.add_patch("/v1/notifications/telegram-sent", self._ack)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/v1"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+async def _open_stream(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    return response
+
+
+async def _send_event(response: web.StreamResponse, notification: dict) -> None:
+    payload = json.dumps(notification)
+    await response.write(f"id: {notification['id']}\nevent: notification\ndata: {payload}\n\n".encode())
+
+
+class FakeBot:
+    """Records the text of every message instead of calling Telegram."""
+
+    def __init__(self):
+        self.sent: Counter = Counter()
+
+    async def send_message(self, chat_id: str, text: str, **kwargs) -> None:
+        for line in text.splitlines():
+            if line.endswith("]") and "[n" in line:
+                self.sent[line[line.index("[n") + 1:-1]] += 1
+
+
+class ServerSentEventsParsingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.backend = StandInBackend()
+        await self.backend.start()
+
+    async def asyncTearDown(self):
+        await self.backend.stop()
+
+    async def test_parses_multiline_data_comments_and_ids(self):
+        async def handler(request: web.Request, last_event_id: Optional[str]) -> web.StreamResponse:
+            response = await _open_stream(request)
+            await response.write(
+                b": heartbeat\n\n"
+                b"id: 1\nevent: notification\ndata: {\"a\":\ndata: 1}\n\n"
+                b"data: plain\r\n\r\n"
+                b": comment between fields\nevent: ping\nid: 7\ndata:no-space\n\n"
+                b"data: never dispatched without a blank line"
+            )
+            await response.write_eof()
+            return response
+
+        self.backend.stream_handler = handler
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{self.backend.url}/notifications/telegram-stream") as response:
+                events = [event async for event in sse.iter_events(response)]
+
+        self.assertEqual(events, [
+            sse.ServerSentEvent("notification", '{"a":\n1}', "1"),
+            sse.ServerSentEvent("message", "plain", None),
+            sse.ServerSentEvent("ping", "no-space", "7"),
+        ])
+        self.assertEqual(json.loads(events[0].data), {"a": 1})
+
+
+class NotificationStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.backend = StandInBackend()
+        await self.backend.start()
+        self.bot = FakeBot()
+        self.service = NotificationService(self.bot, self.backend.url, workers=2, outbox_path=":memory:")
+        self._stream_closed = asyncio.Event()
+
+    async def asyncTearDown(self):
+        self._stream_closed.set()
+        await self.service.stop()
+        await self.backend.stop()
+
+    async def test_resumes_from_last_event_id_after_disconnect(self):
+        notifications = [_notification(number) for number in range(1, 6)]
+
+        async def handler(request: web.Request, last_event_id: Optional[str]) -> web.StreamResponse:
+            response = await _open_stream(request)
+            if last_event_id is None:
+                # The first connection drops after two events
+                for notification in notifications[:2]:
+                    await _send_event(response, notification)
+                return response
+            for notification in notifications:
+                if notification["id"] > last_event_id:
+                    await _send_event(response, notification)
+            await self._stream_closed.wait()
+            return response
+
+        self.backend.stream_handler = handler
+        await self.service.start()
+
+        await _eventually(lambda: len(self.backend.acked) == len(notifications))
+        self.assertEqual(self.backend.stream_requests[:2], [None, notifications[1]["id"]])
+        self.assertEqual(self.bot.sent, Counter(notification["id"] for notification in notifications))
+
+    async def test_falls_back_to_polling_when_the_stream_is_missing(self):
+        await self._assert_polling_fallback(self.backend._reject)
+
+    async def test_falls_back_to_polling_on_wrong_content_type(self):
+        async def handler(request: web.Request, last_event_id: Optional[str]) -> web.StreamResponse:
+            return web.json_response([])
+
+        await self._assert_polling_fallback(handler)
+
+    async def test_falls_back_to_polling_on_server_error(self):
+        async def handler(request: web.Request, last_event_id: Optional[str]) -> web.StreamResponse:
+            return web.Response(status=503, text="unavailable", content_type="text/event-stream")
+
+        await self._assert_polling_fallback(handler)
+
+    async def _assert_polling_fallback(self, handler) -> None:
+        self.backend.stream_handler = handler
+        await self.service.start()
+        await _eventually(lambda: self.backend.stream_requests)
+
+        # Appears only after the stream was rejected, so it can arrive only through polling
+        self.backend.pending = [_notification(1), _notification(2)]
+        await _eventually(lambda: len(self.backend.acked) == 2)
+        self.assertEqual(self.bot.sent, Counter({"n0001": 1, "n0002": 1}))
+        self.assertEqual(len(self.backend.stream_requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
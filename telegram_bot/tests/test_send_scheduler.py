@@ -0,0 +1,39 @@
+"""
+Tests of the per-chat token buckets of the send scheduler.
+
+Run from the telegram_bot directory:
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from send_scheduler import TokenBucket
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    async def test_touch_discards_tokens_accrued_while_waiting_elsewhere(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        await bucket.acquire()
+        # E.g. the global bucket kept the send waiting long enough to earn the next chat token
+        await asyncio.sleep(0.15)
+        bucket.touch()
+
+        bucket._refill()
+        self.assertLess(bucket._tokens, 0.5)
+
+    async def test_refills_from_the_last_touch(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        await bucket.acquire()
+        bucket.touch()
+        await asyncio.sleep(0.15)
+
+        bucket._refill()
+        self.assertEqual(bucket._tokens, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()